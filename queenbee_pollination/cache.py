@@ -0,0 +1,65 @@
+"""On-disk caches used to avoid repeating API calls between CLI invocations."""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+
+class DiskCache(object):
+    """A folder of JSON values that expire after a number of seconds.
+
+    Values are stored in one file per key so that concurrent processes can read and
+    write different keys safely. Writes are atomic.
+
+    Args:
+        directory: The folder to store the cached values in.
+        ttl: Number of seconds a value stays valid. Set to None to keep values
+            until they are deleted.
+    """
+
+    def __init__(self, directory: str, ttl: float = None):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{name}.json')
+
+    def get(self, key: str):
+        """Get a cached value or None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('expires') is not None and entry['expires'] < time.time():
+            self.delete(key)
+            return None
+        return entry['value']
+
+    def set(self, key: str, value):
+        """Cache a JSON serializable value."""
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            'expires': None if self.ttl is None else time.time() + self.ttl,
+            'value': value,
+        }
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, self._path(key))
+
+    def delete(self, key: str):
+        """Remove a cached value."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Remove all cached values."""
+        shutil.rmtree(self.directory, ignore_errors=True)
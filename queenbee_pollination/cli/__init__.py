@@ -1,3 +1,5 @@
+import importlib
+
 try:
     import click
 except ImportError:
@@ -5,17 +7,75 @@ except ImportError:
         'click modules is not installed. Try `pip install queenbee[cli]` command.'
     )
 
-from .context import Context
-from .pull import pull
-from .push import push
-from .project import project
 
-@click.group(invoke_without_command=True)
+class LazyGroup(click.Group):
+    """A click group that only imports a subcommand when it is used.
+
+    Args:
+        lazy_subcommands: A dictionary of subcommand names and a tuple with the import
+            path of the command (``module:attribute``) and the short help text that
+            is shown in the list of commands.
+    """
+
+    def __init__(self, *args, lazy_subcommands: dict = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            import_path, _ = self.lazy_subcommands[cmd_name]
+            module_name, attribute = import_path.split(':')
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        # list the lazy subcommands without importing them
+        rows = []
+        for cmd_name in self.list_commands(ctx):
+            if cmd_name in self.commands:
+                command = self.commands[cmd_name]
+                if command.hidden:
+                    continue
+                short_help = command.get_short_help_str(formatter.width)
+            else:
+                short_help = self.lazy_subcommands[cmd_name][1]
+            rows.append((cmd_name, short_help))
+
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+
+@click.group(
+    cls=LazyGroup,
+    invoke_without_command=True,
+    lazy_subcommands={
+        'cache': ('queenbee_pollination.cli.cache:cache', 'manage local caches'),
+        'project': (
+            'queenbee_pollination.cli.project:project',
+            'manage project files and runs'
+        ),
+        'pull': (
+            'queenbee_pollination.cli.pull:pull',
+            'download recipes and plugins from a registry'
+        ),
+        'push': (
+            'queenbee_pollination.cli.push:push',
+            'push recipes and plugins to a registry'
+        ),
+    },
+)
 @click.version_option()
 def pollination():
     """
     pollination cloud plugin
     """
+    from .context import Context
+
     ctx = click.get_current_context()
     queenbee_config = ctx.obj
 
@@ -24,8 +84,3 @@ def pollination():
 
     if ctx.invoked_subcommand is None:
         click.echo(ctx.command.get_help(ctx))
-
-
-pollination.add_command(pull)
-pollination.add_command(push)
-pollination.add_command(project)
\ No newline at end of file
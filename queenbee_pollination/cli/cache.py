@@ -0,0 +1,39 @@
+import os
+
+from ..cache import DiskCache
+
+try:
+    import click
+except ImportError:
+    raise ImportError(
+        'click modules not installed. Try `pip install queenbee-pollination[cli]` command.'
+    )
+
+# folders in the cache directory and what they hold
+CACHES = {
+    'accounts': 'details of the logged in account',
+    'manifests': 'file hashes recorded by "project folder upload --sync"',
+    'packages': 'recipes and plugins downloaded by "pull"',
+    'package-manifests': 'recipes and plugins parsed by "push"',
+    'runs': 'index of project runs used by "project run list --index"',
+}
+
+
+@click.group('cache')
+def cache():
+    pass
+
+
+@cache.command('clear')
+@click.argument('names', nargs=-1, type=click.Choice(sorted(CACHES)))
+def clear(names):
+    """clear local caches
+
+    Clears every cache if no cache names are provided.
+    """
+    ctx = click.get_current_context()
+    cache_directory = ctx.obj.config.cache_directory
+
+    for name in names or sorted(CACHES):
+        DiskCache(os.path.join(cache_directory, name)).clear()
+        click.echo(f'Cleared {name} cache: {CACHES[name]}')
@@ -1,9 +1,14 @@
-from pydantic import Field
+from typing import TYPE_CHECKING
+
+from pydantic import Field, PrivateAttr
 from queenbee.base.basemodel import BaseModel
 from queenbee.cli.context import Context as QueenbeeContext
 
-from ..config import Config as QueenbeePollinationConfig
-from ..client import Client
+from ..config import Config as QueenbeePollinationConfig, jwt_expires_soon, \
+    jwt_expiry
+
+if TYPE_CHECKING:
+    from ..client import Client
 
 
 class Context(BaseModel):
@@ -17,12 +22,37 @@ class Context(BaseModel):
         default_factory=QueenbeePollinationConfig,
     )
 
-    def get_client(self) -> Client:
-        self.queenbee.refresh_tokens()
+    _client: 'Client' = PrivateAttr(None)
+
+    def _get_jwt_token(self) -> str:
         auth_header = self.queenbee.config.get_auth_header(
             repository_url=self.config.endpoint
         )
 
-        if auth_header is not None:
-            self.config.jwt_token = auth_header.split('Bearer ')[-1]
-        return self.config.get_client()
+        if auth_header is None:
+            return None
+        return auth_header.split('Bearer ')[-1]
+
+    def get_client(self) -> 'Client':
+        """Get a client for the configured endpoint.
+
+        Tokens are only refreshed when the current JWT is about to expire or its
+        expiry can not be decoded. The client is re-used for as long as the token
+        does not change.
+        """
+        if self.queenbee is not None:
+            jwt_token = self._get_jwt_token()
+            # tokens whose expiry can not be read are refreshed on every call
+            if jwt_token is not None and (
+                jwt_expiry(jwt_token) is None or jwt_expires_soon(jwt_token)
+            ):
+                self.queenbee.refresh_tokens()
+                jwt_token = self._get_jwt_token()
+
+            if jwt_token is not None and jwt_token != self.config.jwt_token:
+                self.config.jwt_token = jwt_token
+                self._client = None
+
+        if self._client is None:
+            self._client = self.config.get_client()
+        return self._client
@@ -1,19 +1,24 @@
+import csv
+import glob
+import io
+import json
 import os
 from concurrent.futures import ThreadPoolExecutor as PoolExecutor
-from multiprocessing import cpu_count
-import tarfile
-from urllib3.exceptions import ProtocolError
-from typing import List
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
 
 import requests
 from tabulate import tabulate
 
-from queenbee.job import Job
-
 from pollination_sdk.exceptions import ApiException
 from pollination_sdk import models
 
 from ..client import Client
+from ..runs import ACTIVE_STATUSES, RunIndex, artifact_paths, as_utc, iter_runs, \
+    run_outputs, run_row, watch_runs
+from ..transfer import THROTTLE_STATUSES, ConcurrencyLimiter, FolderDownloader, \
+    FolderManifest, MultipartFileEncoder, PathFilter, TarBundler, artifact_key, \
+    bundle_order, extract_bundle, is_bundle, map_bounded, raise_for_retry, scan_files
 
 try:
     import click
@@ -23,6 +28,56 @@ except ImportError:
     )
 
 
+def list_remote_files(
+    client: Client, owner: str, name: str, path: List[str] = None
+) -> Dict[str, models.FileMeta]:
+    """Recursively list the files under a project folder keyed by artifact key."""
+    remote_files = {}
+    folders = [path]
+    while folders:
+        folder_path = folders.pop()
+        try:
+            files = client.artifacts.list_artifacts(
+                owner=owner, name=name, path=folder_path
+            )
+        except ApiException as error:
+            if error.status == 404:
+                continue
+            raise click.ClickException(error)
+
+        for file in files:
+            if file.file_type == 'folder':
+                folders.append([file.key])
+            else:
+                remote_files[file.key.lstrip('/')] = file
+
+    return remote_files
+
+
+def upload_file(
+    client: Client, owner: str, name: str, file_path: str, key: str,
+    api_limiter: ConcurrencyLimiter, transfer_limiter: ConcurrencyLimiter
+) -> requests.Response:
+    """Upload a local file to a project artifact key."""
+    res = api_limiter.call(
+        lambda: client.artifacts.create_artifact(
+            owner=owner,
+            name=name,
+            key_request={'key': key}
+        )
+    )
+
+    def _post():
+        # stream the file from disk rather than building the form data in memory
+        with MultipartFileEncoder(res.fields, file_path, key) as encoder:
+            response = client.session.post(
+                res.url, data=encoder, headers={'Content-Type': encoder.content_type})
+        raise_for_retry(response)
+        return response
+
+    return transfer_limiter.call(_post, size=os.path.getsize(file_path))
+
+
 def handle_project(client: Client, owner: str, name: str):
 
     try:
@@ -62,6 +117,39 @@ def handle_project(client: Client, owner: str, name: str):
             click.echo('Successfully created project!')
 
 
+def concurrency_options(func):
+    """Add the options used to control the concurrency of artifact transfers."""
+    func = click.option(
+        '--adaptive', help='adjust the number of concurrent transfers and API calls '
+        'to the observed throughput and throttling. The concurrency options are used '
+        'as upper limits.', type=bool, default=False, is_flag=True
+    )(func)
+    func = click.option(
+        '--api-concurrency', help='maximum number of concurrent API calls',
+        type=click.IntRange(min=1), default=4, show_default=True
+    )(func)
+    func = click.option(
+        '--concurrency', help='maximum number of concurrent file transfers',
+        type=click.IntRange(min=1), default=8, show_default=True
+    )(func)
+    return func
+
+
+def filter_options(func):
+    """Add the options used to select files with glob patterns."""
+    func = click.option(
+        '--exclude', help='glob pattern for files or folders to skip. Patterns '
+        'without a "/" match names at any depth. Can be used multiple times.',
+        multiple=True
+    )(func)
+    func = click.option(
+        '--include', help='glob pattern for files or folders to transfer. Patterns '
+        'without a "/" match names at any depth. Can be used multiple times.',
+        multiple=True
+    )(func)
+    return func
+
+
 @click.group('project')
 def project():
     pass
@@ -75,9 +163,30 @@ def folder():
 @click.argument('path', default='.', type=click.Path(exists=True))
 @click.option('-p', '--project', type=str, required=True)
 @click.option('-o', '--owner', help='a pollination account name')
-def upload_folder(path, owner, project):
+@click.option(
+    '--sync', help='only upload files that are new or changed since the last upload',
+    type=bool, default=False, is_flag=True)
+@click.option(
+    '--archive', help='bundle files into compressed tar archives and upload the '
+    'archives instead of the individual files', type=bool, default=False, is_flag=True)
+@click.option(
+    '--archive-threshold', help='only bundle files smaller than this number of bytes '
+    'when using --archive. Larger files are uploaded individually. By default all '
+    'files are bundled.', type=click.IntRange(min=1))
+@click.option(
+    '--archive-size', help='maximum number of uncompressed bytes in a single archive',
+    type=click.IntRange(min=1), default=512 * 1024 * 1024, show_default=True)
+@filter_options
+@concurrency_options
+def upload_folder(
+    path, owner, project, sync, archive, archive_threshold, archive_size, include,
+    exclude, concurrency, api_concurrency, adaptive
+):
     """upload project files"""
 
+    if sync and archive:
+        raise click.UsageError('--sync can not be used together with --archive')
+
     ctx = click.get_current_context()
     client = ctx.obj.get_client()
 
@@ -91,41 +200,113 @@ def upload_folder(path, owner, project):
         name=project,
     )
 
+    api_limiter = ConcurrencyLimiter(api_concurrency, adaptive=adaptive)
+    transfer_limiter = ConcurrencyLimiter(concurrency, adaptive=adaptive)
 
-    def _upload_artifact(key: str):
-        res = client.artifacts.create_artifact(
+    manifest = None
+    remote_files = {}
+    if sync:
+        manifest = FolderManifest.for_folder(
+            cache_directory=ctx.obj.config.cache_directory,
+            endpoint=ctx.obj.config.endpoint,
+            owner=owner,
+            project=project,
+            folder=path,
+        )
+        root_key = artifact_key(path)
+        remote_files = list_remote_files(
+            client=client,
             owner=owner,
             name=project,
-            key_request={'key': key.replace('\\', '/')}
+            path=None if root_key == '.' else [root_key],
         )
 
-        # Demonstrate how another Python program can use the presigned URL to upload a file
-        with open(key, 'rb') as f:
-            files = {'file': (key, f)}
-            http_response = requests.post(
-                res.url, data=res.fields, files=files)
-
-            if http_response.status_code == 204:
-                click.echo(f"Uploaded {key}")
-
-
-    keys = []
-    for root, subdirs, files in os.walk(path):
-        for fi in files:
-            key = os.path.join(root, fi)
-            keys.append(key)
-
-    worker_count = max(cpu_count() - 1, 1)
-    with PoolExecutor(max_workers=worker_count) as executor:
-        for _ in executor.map(_upload_artifact, keys):
-            pass
+    def _upload_artifact(item: Tuple[str, str, bool]) -> bool:
+        file_path, key, is_temporary = item
+
+        if manifest is not None:
+            remote_file = remote_files.get(key.lstrip('/'))
+            remote_size = None if remote_file is None else remote_file.size
+            if manifest.is_synced(file_path, key, remote_size):
+                return False
+
+        try:
+            upload_file(
+                client, owner, project, file_path, key, api_limiter, transfer_limiter
+            ).raise_for_status()
+        except requests.HTTPError as error:
+            raise click.ClickException(f'Failed to upload {key}: {error}')
+        finally:
+            if is_temporary:
+                os.remove(file_path)
+
+        click.echo(f"Uploaded {key}")
+        if manifest is not None:
+            manifest.mark_uploaded(key)
+
+        return True
+
+    # a single file is bundled into an archive in its parent folder
+    bundle_root = path if os.path.isdir(path) else os.path.dirname(path)
+
+    def _upload_items(bundler: TarBundler = None):
+        """Yield the files to upload as (path, key, is_temporary) tuples."""
+        for file_path in scan_files(path, PathFilter(include=include, exclude=exclude)):
+            if bundler is None or (
+                archive_threshold is not None
+                and os.path.getsize(file_path) >= archive_threshold
+            ):
+                yield file_path, artifact_key(file_path), False
+                continue
+
+            arcname = os.path.relpath(file_path, bundle_root or '.').replace('\\', '/')
+            bundle = bundler.add(file_path, arcname)
+            if bundle is not None:
+                yield (*bundle, True)
+
+        if bundler is not None:
+            bundle = bundler.finish()
+            if bundle is not None:
+                yield (*bundle, True)
+
+    file_count = 0
+    uploaded = 0
+    bundler = TarBundler(artifact_key(bundle_root or '.'), max_size=archive_size) if archive else None
+    try:
+        with PoolExecutor(max_workers=concurrency) as executor:
+            for res in map_bounded(
+                executor, _upload_artifact, _upload_items(bundler), limit=concurrency * 2
+            ):
+                file_count += 1
+                uploaded += res
+    finally:
+        if manifest is not None:
+            manifest.save()
+        if bundler is not None:
+            bundler.close()
+
+    if manifest is not None:
+        click.echo(
+            f'Uploaded {uploaded} files. Skipped {file_count - uploaded} unchanged files.'
+        )
 
 @folder.command('download')
 @click.option('-p', '--project', help='project name', type=str, required=True)
 @click.option('-o', '--owner', help='a pollination account name')
 @click.option('--path', help='the subpath/subfolder to download')
 @click.option('-l', '--local-path', help='the path to save the files at on the local machine')
-def download_artifacts(project, owner, path, local_path):
+@click.option(
+    '-f', '--force', help='download files even if an identical local copy exists',
+    type=bool, default=False, is_flag=True)
+@click.option(
+    '--extract', help='extract archives created with "upload --archive" after they '
+    'are downloaded', type=bool, default=False, is_flag=True)
+@filter_options
+@concurrency_options
+def download_artifacts(
+    project, owner, path, local_path, force, extract, include, exclude, concurrency,
+    api_concurrency, adaptive
+):
     """download project files"""
     if path is not None:
         path = [path]
@@ -146,42 +327,41 @@ def download_artifacts(project, owner, path, local_path):
     if local_path is None:
         local_path = os.getcwd()
 
-    if path is not None:
-        path = [path]
+    downloader = FolderDownloader(
+        list_folder=lambda folder_path: client.artifacts.list_artifacts(
+            owner=owner, name=project, path=folder_path),
+        get_download_link=lambda key: client.artifacts.download_artifact(
+            owner=owner, name=project, path=key),
+        session=client.session,
+        api_limiter=ConcurrencyLimiter(api_concurrency, adaptive=adaptive),
+        transfer_limiter=ConcurrencyLimiter(concurrency, adaptive=adaptive),
+        skip_existing=not force,
+        path_filter=PathFilter(include=include, exclude=exclude),
+    )
 
-    def recusrive_download(owner: str, name: str, local_path: str, path: List[str] = None):
+    bundles = []
 
-        files = client.artifacts.list_artifacts(owner=owner, name=name, path=path)
+    def _on_download(file: models.FileMeta, file_path: str):
+        click.echo(f'Downloaded {file.key}')
+        if extract and is_bundle(file.file_name):
+            bundles.append((file.key, file_path))
 
-        for file in files:
-            if file.type == 'folder':
-                recusrive_download(
-                    owner=owner,
-                    name=name,
-                    path=[file.key],
-                    local_path=os.path.join(local_path, file.file_name)
-                )
-            else:
-                download_link = client.artifacts.download_artifact(owner=owner, name=project, path=file.key)
+    try:
+        downloaded, skipped = downloader.download(
+            local_path=local_path,
+            path=path,
+            on_download=_on_download,
+        )
+    except ApiException as error:
+        raise click.ClickException(error)
 
-                response = requests.get(url=download_link)
+    # extract archives in upload order so files from later uploads win
+    for key, file_path in sorted(bundles, key=lambda bundle: bundle_order(bundle[1])):
+        extract_bundle(file_path)
+        click.echo(f'Extracted {key}')
 
-                file_path = os.path.join(local_path, file.file_name)
-                file_dir = os.path.dirname(file_path)
-                if not os.path.exists(file_dir):
-                    os.makedirs(os.path.dirname(file_path))
-                
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
+    click.echo(f'Downloaded {downloaded} files. Skipped {skipped} unchanged files.')
 
-    
-    recusrive_download(
-        owner=owner,
-        name=project,
-        path=path,
-        local_path=local_path
-    )
- 
 
 @folder.command('delete')
 @click.option('-p', '--project', help='project name', type=str, required=True)
@@ -214,16 +394,95 @@ def run():
     pass
 
 
+JOB_FILE_EXTENSIONS = ('.yaml', '.yml', '.json')
+
+
+def resolve_job_files(sources: List[str]) -> List[str]:
+    """Expand a list of job files, folders and glob patterns into job file paths."""
+    job_files = []
+    for source in sources:
+        if os.path.isfile(source):
+            matches = [source]
+        elif os.path.isdir(source):
+            matches = sorted(
+                os.path.join(source, f) for f in os.listdir(source)
+                if f.lower().endswith(JOB_FILE_EXTENSIONS)
+                and os.path.isfile(os.path.join(source, f))
+            )
+        else:
+            matches = sorted(
+                f for f in glob.glob(source, recursive=True) if os.path.isfile(f)
+            )
+
+        if not matches:
+            raise click.BadParameter(
+                f'No job files found at {source}', param_hint='JOB_FILES'
+            )
+
+        job_files.extend(f for f in matches if f not in job_files)
+
+    return job_files
+
+
+def echo_rows(rows: List[dict], headers: Dict[str, str], output_format: str = 'table'):
+    """Print a list of rows as a table, JSON, JSON lines or CSV.
+
+    Args:
+        rows: A list of dictionaries with the same keys as ``headers``.
+        headers: A dictionary of row keys and the column titles to use for tables.
+        output_format: One of table, json, jsonl or csv.
+    """
+    if output_format == 'json':
+        click.echo(json.dumps(rows, indent=2, default=str))
+    elif output_format == 'jsonl':
+        for row in rows:
+            click.echo(json.dumps(row, default=str))
+    elif output_format == 'csv':
+        stream = io.StringIO()
+        writer = csv.DictWriter(stream, fieldnames=list(headers))
+        writer.writeheader()
+        writer.writerows(rows)
+        click.echo(stream.getvalue(), nl=False)
+    else:
+        table = [[row[key] for key in headers] for row in rows]
+        click.echo(tabulate(table, headers=list(headers.values())))
+
+
 @run.command('submit')
-@click.argument('job_file', type=click.Path(exists=True))
+@click.argument('job_files', nargs=-1, required=True)
 @click.option('-p', '--project', help='project name', type=str, required=True)
 @click.option('-o', '--owner', help='a pollination account name')
-def submit(project, owner, job_file):
-    """Schedule a job to be run"""
+@click.option(
+    '--concurrency', help='maximum number of jobs to submit at the same time',
+    type=click.IntRange(min=1), default=4, show_default=True)
+@click.option(
+    '--adaptive', help='adjust the number of concurrent submissions to throttling',
+    type=bool, default=False, is_flag=True)
+@click.option(
+    '--output-format', help='format of the table of submitted runs',
+    type=click.Choice(['table', 'json', 'csv']), default='table', show_default=True)
+@click.option(
+    '--stage-inputs', help='upload the project folder inputs that exist on the local '
+    'machine before submitting. Inputs are uploaded once to a content-addressed '
+    'project folder and the jobs are updated to point at them.', type=bool,
+    default=False, is_flag=True)
+def submit(project, owner, job_files, concurrency, adaptive, output_format, stage_inputs):
+    """Schedule jobs to be run
+
+    JOB_FILES can be job files, folders of job files or glob patterns. With
+    --stage-inputs, relative input paths are resolved from the folder of each job
+    file.
+    """
+    # queenbee job models are only needed to submit runs
+    from queenbee.job import Job
+
+    from ..staging import InputStager
 
     ctx = click.get_current_context()
     client = ctx.obj.get_client()
 
+    job_files = resolve_job_files(job_files)
+
     if owner is None:
         account = client.get_account()
         owner = account.username
@@ -234,26 +493,128 @@ def submit(project, owner, job_file):
         name=project,
     )
 
-    job = Job.from_file(job_file)
+    def _parse(job_file: str):
+        try:
+            return Job.from_file(job_file)
+        except Exception as error:
+            raise click.ClickException(f'Invalid job file {job_file}: {error}')
 
-    try:
-        res = client.runs.create_run(
-            owner=owner,
-            name=project,
-            job=job.dict(),
-        )
-    except ApiException as error:
-        raise click.ClickException(error)
+    limiter = ConcurrencyLimiter(concurrency, adaptive=adaptive)
+
+    stager = None
+    if stage_inputs:
+        transfer_limiter = ConcurrencyLimiter(concurrency, adaptive=adaptive)
+
+        def _list_folder(key: str) -> List[str]:
+            try:
+                files = limiter.call(
+                    lambda: client.artifacts.list_artifacts(
+                        owner=owner, name=project, path=[key]
+                    )
+                )
+            except ApiException as error:
+                if error.status == 404:
+                    return []
+                raise
+            return [file.key.strip('/') for file in files]
+
+        def _upload(file_path: str, key: str):
+            upload_file(
+                client, owner, project, file_path, key, limiter, transfer_limiter
+            ).raise_for_status()
+            click.echo(f'Uploaded {key}')
+
+        stager = InputStager(upload=_upload, list_folder=_list_folder)
+
+    def _submit(job_file: str, job: Job) -> str:
+        if stager is not None:
+            job = stager.stage(job, os.path.dirname(job_file))
+        # a run may already be created when a 5xx error is returned so only
+        # retry requests that were throttled
+        return limiter.call(
+            lambda: client.runs.create_run(
+                owner=owner,
+                name=project,
+                job=job.dict(),
+            ),
+            retry_statuses=THROTTLE_STATUSES,
+        ).id
+
+    with PoolExecutor(max_workers=concurrency) as executor:
+        # validate every job before any of them is submitted
+        jobs = list(executor.map(_parse, job_files))
+        submissions = [
+            executor.submit(_submit, job_file, job)
+            for job_file, job in zip(job_files, jobs)
+        ]
+
+    rows = []
+    for job_file, submission in zip(job_files, submissions):
+        error = submission.exception()
+        if isinstance(error, ApiException):
+            error = f'{error.status} {error.reason}'
+        elif error is not None:
+            error = str(error)
+        rows.append({
+            'job_file': job_file,
+            'run_id': submission.result() if error is None else None,
+            'error': error,
+        })
+
+    echo_rows(
+        rows,
+        headers={'job_file': 'Job File', 'run_id': 'Run ID', 'error': 'Error'},
+        output_format=output_format,
+    )
+
+    failed = sum(row['error'] is not None for row in rows)
+    if failed:
+        raise click.ClickException(f'Failed to schedule {failed} of {len(rows)} jobs')
 
-    click.echo(f'Successfully scheduled job: {res.id}')
 
+RUN_HEADERS = {
+    'id': 'ID',
+    'status': 'Status',
+    'started_at': 'Started At',
+    'finished_at': 'Finished At',
+}
 
 
 @run.command('list')
 @click.option('-p', '--project', type=str, required=True)
 @click.option('-o', '--owner', help='a pollination account name')
 @click.option('--page', type=int, default=1, show_default=True)
-def list_runs(project, owner, page):
+@click.option(
+    '--per-page', help='number of runs to request per page', type=click.IntRange(min=1),
+    default=25, show_default=True)
+@click.option(
+    '--all', 'all_pages', help='list the runs on every page starting from --page',
+    type=bool, default=False, is_flag=True)
+@click.option(
+    '--limit', help='maximum number of runs to list', type=click.IntRange(min=1))
+@click.option('--status', help='only list runs with this status')
+@click.option(
+    '--since', help='only list runs that started at or after this UTC time',
+    type=click.DateTime())
+@click.option(
+    '--until', help='only list runs that started before this UTC time',
+    type=click.DateTime())
+@click.option(
+    '--output-format', help='print a table sorted by start time or stream the runs as '
+    'JSON lines while pages are fetched', type=click.Choice(['table', 'jsonl']),
+    default='table', show_default=True)
+@click.option(
+    '--index', 'use_index', help='answer the query from a local index of the project '
+    'runs. The index is refreshed with the runs that are new or still active first.',
+    type=bool, default=False, is_flag=True)
+@click.option(
+    '--max-age', help='with --index, only refresh the index if it was last synced more '
+    'than this number of seconds ago', type=click.IntRange(min=0), default=0,
+    show_default=True)
+def list_runs(
+    project, owner, page, per_page, all_pages, limit, status, since, until,
+    output_format, use_index, max_age
+):
     """List runs for a given project"""
 
     ctx = click.get_current_context()
@@ -263,18 +624,244 @@ def list_runs(project, owner, page):
         account = client.get_account()
         owner = account.username
 
+    since = as_utc(since)
+    until = as_utc(until)
+
+    if use_index:
+        index_path = os.path.join(ctx.obj.config.cache_directory, 'runs', 'index.sqlite3')
+        with RunIndex(index_path) as index:
+            last_synced = index.last_synced(owner, project)
+            if last_synced is None or \
+                    (datetime.now(timezone.utc) - last_synced).total_seconds() >= max_age:
+                try:
+                    index.refresh(client, owner, project)
+                except ApiException as error:
+                    raise click.ClickException(error)
+            rows = index.query(
+                owner, project, status=status, since=since, until=until, limit=limit
+            )
+        echo_rows(rows, RUN_HEADERS, output_format)
+        return
+
+    def _in_window(row: dict) -> bool:
+        if since is None and until is None:
+            return True
+        started_at = as_utc(row['started_at'])
+        if started_at is None:
+            return False
+        return (since is None or started_at >= since) \
+            and (until is None or started_at < until)
+
+    runs = iter_runs(
+        client=client,
+        owner=owner,
+        name=project,
+        status=status,
+        page=page,
+        per_page=per_page,
+        all_pages=all_pages,
+    )
+
+    rows = []
+    listed = 0
     try:
-        res = client.runs.list_runs(
-            owner=owner,
-            name=project,
-            page=page,
+        for run in runs:
+            row = run_row(run)
+            if not _in_window(row):
+                continue
+            if output_format == 'jsonl':
+                # stream rows while the next pages are being fetched
+                echo_rows([row], RUN_HEADERS, output_format)
+            else:
+                rows.append(row)
+            listed += 1
+            if limit is not None and listed >= limit:
+                break
+    except ApiException as error:
+        raise click.ClickException(error)
+    finally:
+        runs.close()
+
+    if output_format == 'table':
+        rows.sort(
+            key=lambda r: as_utc(r['started_at']) or datetime.min.replace(tzinfo=timezone.utc),
+            reverse=True
+        )
+        echo_rows(rows, RUN_HEADERS, output_format)
+
+
+@run.command('watch')
+@click.argument('run_ids', nargs=-1)
+@click.option('-p', '--project', help='project name', type=str, required=True)
+@click.option('-o', '--owner', help='a pollination account name')
+@click.option(
+    '--all-active', help='watch all the runs in the project that are still active',
+    type=bool, default=False, is_flag=True)
+@click.option(
+    '--interval', help='initial number of seconds between status checks',
+    type=click.FloatRange(min=0), default=5, show_default=True)
+@click.option(
+    '--max-interval', help='maximum number of seconds between status checks. The '
+    'interval grows up to this value while no run changes status.',
+    type=click.FloatRange(min=0), default=60, show_default=True)
+@click.option(
+    '--timeout', help='stop watching after this number of seconds',
+    type=click.FloatRange(min=0))
+@click.option(
+    '--concurrency', help='maximum number of status requests to send at the same time',
+    type=click.IntRange(min=1), default=4, show_default=True)
+@click.option(
+    '--output-format', help='format of the summary table',
+    type=click.Choice(['table', 'json', 'csv']), default='table', show_default=True)
+def watch(
+    project, owner, run_ids, all_active, interval, max_interval, timeout, concurrency,
+    output_format
+):
+    """Wait for runs to finish
+
+    Status changes are printed as they happen and a summary is printed once every
+    run has finished. The command fails if any of the runs did not succeed.
+    """
+
+    ctx = click.get_current_context()
+    client = ctx.obj.get_client()
+
+    if not run_ids and not all_active:
+        raise click.UsageError('Provide one or more RUN_IDS or use --all-active.')
+
+    if owner is None:
+        account = client.get_account()
+        owner = account.username
+
+    limiter = ConcurrencyLimiter(concurrency)
+    run_ids = list(run_ids)
+
+    def _on_change(run: models.Run, previous: str):
+        if previous is not None:
+            click.echo(f'{run.status.id}: {previous} -> {run.status.status}', err=True)
+
+    try:
+        if all_active:
+            for status in ACTIVE_STATUSES:
+                run_ids.extend(
+                    run.status.id for run in iter_runs(
+                        client, owner, project, status=status, per_page=100,
+                        all_pages=True
+                    )
+                )
+            if not run_ids:
+                click.echo(f'There are no active runs in {owner}/{project}.')
+                return
+
+        runs = watch_runs(
+            client, owner, project, run_ids,
+            interval=interval,
+            max_interval=max(interval, max_interval),
+            timeout=timeout,
+            limiter=limiter,
+            on_change=_on_change,
         )
     except ApiException as error:
         raise click.ClickException(error)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    rows = [run_row(run) for run in runs.values()]
+    echo_rows(rows, RUN_HEADERS, output_format)
+
+    unsuccessful = sum(row['status'] != 'Succeeded' for row in rows)
+    if unsuccessful:
+        raise click.ClickException(f'{unsuccessful} of {len(rows)} runs did not succeed')
+
+
+@run.command('download')
+@click.argument('run_ids', nargs=-1, required=True)
+@click.option('-p', '--project', help='project name', type=str, required=True)
+@click.option('-o', '--owner', help='a pollination account name')
+@click.option(
+    '--output', 'output_names', help='name of an output to download. Can be used '
+    'several times. All the file and folder outputs are downloaded by default.',
+    multiple=True)
+@click.option(
+    '-l', '--local-path', help='the path to save the outputs at on the local machine. '
+    'The outputs of each run are saved in a folder named after the run ID.')
+@click.option(
+    '-f', '--force', help='download files even if an identical local copy exists',
+    type=bool, default=False, is_flag=True)
+@concurrency_options
+def download_outputs(
+    project, owner, run_ids, output_names, local_path, force, concurrency,
+    api_concurrency, adaptive
+):
+    """Download the outputs of one or more runs"""
+
+    ctx = click.get_current_context()
+    client = ctx.obj.get_client()
 
-    table = [[run.status.id, run.status.status, run.status.started_at, run.status.finished_at] for run in res.resources]
+    if owner is None:
+        account = client.get_account()
+        owner = account.username
 
-    table.sort(key=lambda r: r[2], reverse=True)
+    if local_path is None:
+        local_path = os.getcwd()
 
-    print(tabulate(table, headers=['ID', 'Status', 'Stated At', 'Finished At']))
+    run_ids = list(dict.fromkeys(run_ids))
+    api_limiter = ConcurrencyLimiter(api_concurrency, adaptive=adaptive)
+    transfer_limiter = ConcurrencyLimiter(concurrency, adaptive=adaptive)
+
+    def _outputs(run_id: str) -> Dict[str, str]:
+        outputs = api_limiter.call(lambda: run_outputs(client, owner, project, run_id))
+        try:
+            return artifact_paths(outputs, output_names)
+        except ValueError as error:
+            raise click.ClickException(f'Run {run_id}: {error}')
+
+    def _on_download(file: models.FileMeta, file_path: str):
+        click.echo(f'Downloaded {os.path.relpath(file_path, local_path)}')
+
+    def _download(run_id: str, output_name: str, path: str) -> Tuple[int, int]:
+        downloader = FolderDownloader(
+            list_folder=lambda folder_path: client.runs.list_run_artifacts(
+                owner=owner, name=project, run_id=run_id, path=folder_path),
+            get_download_link=lambda key: client.runs.download_run_artifact(
+                owner=owner, name=project, run_id=run_id, path=key),
+            session=client.session,
+            api_limiter=api_limiter,
+            transfer_limiter=transfer_limiter,
+            skip_existing=not force,
+        )
+        parent = os.path.dirname(path)
+        listing = api_limiter.call(
+            lambda: downloader.list_folder([parent] if parent else None)
+        )
+        file = next((f for f in listing if f.key.strip('/') == path), None)
+        if file is None:
+            raise click.ClickException(
+                f'Output {output_name} of run {run_id} was not found at {path}'
+            )
+
+        target = os.path.join(local_path, run_id, *path.split('/'))
+        if file.file_type == 'folder':
+            return downloader.download(
+                local_path=target, path=[path], on_download=_on_download
+            )
+        downloaded = downloader.download_file(file, target, on_download=_on_download)
+        return int(downloaded), int(not downloaded)
+
+    try:
+        with PoolExecutor(max_workers=api_concurrency) as executor:
+            run_paths = list(executor.map(_outputs, run_ids))
+            results = list(executor.map(
+                lambda task: _download(*task),
+                [
+                    (run_id, output_name, path)
+                    for run_id, paths in zip(run_ids, run_paths)
+                    for output_name, path in paths.items()
+                ]
+            ))
+    except ApiException as error:
+        raise click.ClickException(error)
 
+    downloaded = sum(result[0] for result in results)
+    skipped = sum(result[1] for result in results)
+    click.echo(f'Downloaded {downloaded} files. Skipped {skipped} unchanged files.')
@@ -1,12 +1,20 @@
 import os
 import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Tuple, Union
+from urllib.parse import urlparse
 
 from queenbee.recipe import Recipe
+from queenbee.recipe.dependency import Dependency
 from queenbee.plugin import Plugin
 from queenbee.repository.package import PackageVersion
 
 from pollination_sdk.exceptions import ApiException
 
+from ..client import Client
+from ..packages import PackageCache, get_package_tag
+
 try:
     import click
 except ImportError:
@@ -15,6 +23,240 @@ except ImportError:
     )
 
 
+def get_package(
+    client: Client, cache: PackageCache, repo_type: str, owner: str, name: str,
+    tag: str = None
+) -> Tuple[str, dict]:
+    """Get the manifest and readme of a recipe or plugin tag.
+
+    Tags that were pulled before are read from the local package cache without
+    any API calls. The latest tag of a package is only resolved again once its
+    cached value expires.
+
+    Returns:
+        str -- The tag of the package.
+        dict -- A dictionary with the package ``manifest`` and ``readme``.
+    """
+    api = client.recipes if repo_type == 'recipe' else client.plugins
+    display_name = repo_type.capitalize()
+    host = client.config.host
+
+    if tag is None:
+        latest_key = PackageCache.key(host, repo_type, owner, name)
+        tag = cache.get_latest_tag(latest_key)
+        if tag is None:
+            try:
+                res = getattr(api, f'get_{repo_type}')(
+                    owner=owner,
+                    name=name,
+                )
+            except ApiException as error:
+                if error.status == 404:
+                    raise click.ClickException(f'{display_name} not found: {owner}/{name}')
+                raise click.ClickException(error)
+
+            tag = res.latest_tag
+            cache.set_latest_tag(latest_key, tag)
+
+    key = PackageCache.key(host, repo_type, owner, name, tag)
+    package = cache.get(key)
+    if package is not None:
+        return tag, package
+
+    try:
+        res = get_package_tag(client, repo_type, owner, name, tag)
+    except ApiException as error:
+        if error.status == 404:
+            raise click.ClickException(f'{display_name} not found: {owner}/{name}:{tag}')
+        raise click.ClickException(error)
+
+    package = {'manifest': res['manifest'], 'readme': res.get('readme')}
+    cache.set(key, package)
+    return tag, package
+
+
+def dependency_owner(dependency: Dependency) -> str:
+    """Get the account that a Pollination registry dependency belongs to.
+
+    Pollination registry sources end with ``/registries/{owner}``.
+    """
+    parts = urlparse(dependency.source).path.rstrip('/').split('/')
+    if len(parts) < 2 or parts[-2] != 'registries':
+        raise click.ClickException(
+            f'Dependency {dependency.name} is not from a Pollination registry: '
+            f'{dependency.source}'
+        )
+    return parts[-1]
+
+
+def dependency_key(dependency: Dependency) -> Tuple[str, str, str, str]:
+    return (
+        dependency.dependency_kind, dependency_owner(dependency), dependency.name,
+        dependency.tag
+    )
+
+
+def get_dependencies(
+    client: Client, cache: PackageCache, recipe: Recipe, concurrency: int = 8
+) -> Dict[tuple, Tuple[Union[Recipe, Plugin], str]]:
+    """Get every plugin and recipe that a recipe depends on.
+
+    The dependencies of each recipe are requested as soon as that recipe is
+    fetched so the whole dependency graph is fetched concurrently. Packages that are
+    used by several recipes are only fetched once.
+
+    Returns:
+        Dict[tuple, Tuple[Union[Recipe, Plugin], str]] -- The manifest and readme of
+        each package by (kind, owner, name, tag).
+    """
+    def _fetch(key: tuple) -> Tuple[Union[Recipe, Plugin], str]:
+        kind, owner, name, tag = key
+        _, package = get_package(client, cache, kind, owner, name, tag)
+        package_class = Recipe if kind == 'recipe' else Plugin
+        return package_class.parse_obj(package['manifest']), package['readme']
+
+    packages = {}
+    pending = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        manifests = [recipe]
+        while manifests or pending:
+            for manifest in manifests:
+                for dependency in getattr(manifest, 'dependencies', None) or []:
+                    key = dependency_key(dependency)
+                    if key not in packages and key not in pending.values():
+                        pending[executor.submit(_fetch, key)] = key
+            manifests = []
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = pending.pop(future)
+                packages[key] = future.result()
+                manifests.append(packages[key][0])
+
+    return packages
+
+
+def write_dependencies(
+    manifest: Union[Recipe, Plugin], folder_path: str,
+    packages: Dict[tuple, Tuple[Union[Recipe, Plugin], str]]
+):
+    """Write the dependencies of a recipe to its ``.dependencies`` folder.
+
+    This is the same layout that ``queenbee recipe install`` creates: each
+    dependency is written to ``.dependencies/{kind}/{ref_name}``, and recipe
+    dependencies get their own ``.dependencies`` folder.
+    """
+    for dependency in getattr(manifest, 'dependencies', None) or []:
+        package, readme_string = packages[dependency_key(dependency)]
+        dependency_path = os.path.join(
+            folder_path, '.dependencies', dependency.dependency_kind, dependency.ref_name
+        )
+        package.to_folder(folder_path=dependency_path, readme_string=readme_string)
+        write_dependencies(package, dependency_path, packages)
+
+
+def _same_file(file_path: str, other_path: str) -> bool:
+    if os.path.getsize(file_path) != os.path.getsize(other_path):
+        return False
+    with open(file_path, 'rb') as f, open(other_path, 'rb') as other:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if chunk != other.read(1024 * 1024):
+                return False
+            if not chunk:
+                return True
+
+
+def _update_folder(source: str, target: str) -> int:
+    """Move the files that differ from source into target and remove stale files.
+
+    Every file is swapped in with an atomic rename so a file in target is always
+    either the old or the new version, never a partially written one.
+
+    Returns:
+        int -- The number of files that were added, changed or removed.
+    """
+    changes = 0
+    package_paths = set()
+    for folder, _, file_names in os.walk(source):
+        relative_folder = os.path.relpath(folder, source)
+        package_paths.add(os.path.normpath(relative_folder))
+        target_folder = os.path.join(target, relative_folder)
+        if os.path.isfile(target_folder):
+            os.remove(target_folder)
+        os.makedirs(target_folder, exist_ok=True)
+        for file_name in file_names:
+            package_paths.add(os.path.normpath(os.path.join(relative_folder, file_name)))
+            target_file = os.path.join(target_folder, file_name)
+            if os.path.isdir(target_file):
+                shutil.rmtree(target_file)
+            elif os.path.isfile(target_file) \
+                    and _same_file(os.path.join(folder, file_name), target_file):
+                continue
+            os.replace(os.path.join(folder, file_name), target_file)
+            changes += 1
+
+    for folder, folder_names, file_names in os.walk(target, topdown=False):
+        relative_folder = os.path.relpath(folder, target)
+        for file_name in file_names:
+            if os.path.normpath(os.path.join(relative_folder, file_name)) \
+                    not in package_paths:
+                os.remove(os.path.join(folder, file_name))
+                changes += 1
+        for folder_name in folder_names:
+            if os.path.normpath(os.path.join(relative_folder, folder_name)) \
+                    not in package_paths:
+                os.rmdir(os.path.join(folder, folder_name))
+
+    return changes
+
+
+def write_package(
+    manifest: Union[Recipe, Plugin], readme_string: str, path: str, force: bool = False,
+    dependencies: Dict[tuple, Tuple[Union[Recipe, Plugin], str]] = None
+) -> int:
+    """Write a recipe or plugin to a folder without exposing a partial package.
+
+    The package is written to a temporary folder next to ``path`` first. If
+    ``path`` does not exist the temporary folder is renamed into place, otherwise
+    only the files that changed are swapped in and files that are no longer part of
+    the package are removed.
+
+    Args:
+        manifest: The recipe or plugin to write.
+        readme_string: The package readme.
+        path: The folder to write the package to.
+        force: Update the folder if it already exists.
+        dependencies: The packages returned by ``get_dependencies`` to write to the
+            ``.dependencies`` folder of a recipe.
+
+    Returns:
+        int -- The number of files that were written or removed.
+    """
+    if os.path.exists(path) and not force:
+        raise FileExistsError(path)
+
+    temp_folder = tempfile.mkdtemp(
+        dir=os.path.dirname(path), prefix=f'.{os.path.basename(path)}-'
+    )
+    try:
+        package_folder = os.path.join(temp_folder, 'package')
+        manifest.to_folder(folder_path=package_folder, readme_string=readme_string)
+        if dependencies is not None:
+            write_dependencies(manifest, package_folder, dependencies)
+        if not os.path.exists(path):
+            try:
+                os.rename(package_folder, path)
+                return sum(len(files) for _, _, files in os.walk(path))
+            except OSError:
+                # the folder was created since it was checked
+                if not force:
+                    raise FileExistsError(path)
+        return _update_folder(package_folder, path)
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+
 @click.group('pull')
 def pull():
     pass
@@ -26,7 +268,13 @@ def pull():
 @click.option('-t', '--tag', help='specific recipe tag to pull')
 @click.option('-p', '--path', help='path to download the recipe to', type=click.Path(exists=True), default='.')
 @click.option('-f', '--force', help='overwrite local files', type=bool, default=False, is_flag=True)
-def recipe(name, owner, tag, path, force):
+@click.option(
+    '--with-dependencies', help='also download the plugins and recipes that the recipe '
+    'depends on to its .dependencies folder', type=bool, default=False, is_flag=True)
+@click.option(
+    '--concurrency', help='maximum number of dependencies to download at the same time',
+    type=click.IntRange(min=1), default=8, show_default=True)
+def recipe(name, owner, tag, path, force, with_dependencies, concurrency):
     """download a recipe from a pollination registry"""
     ctx = click.get_current_context()
     client = ctx.obj.get_client()
@@ -38,47 +286,30 @@ def recipe(name, owner, tag, path, force):
         account = client.get_account()
         owner = account.username
 
-    if tag is None:
-        try:
-            res = client.recipes.get_recipe(
-                owner=owner,
-                name=name,
-            )
-        except ApiException as error:
-            if error.status == 404:
-                raise click.ClickException(f'Recipe not found: {owner}/{name}')
-            raise click.ClickException(error)
-
-        tag = res['latest_tag']
-
-    try:
-        res = client.recipes.get_recipe_tag(
-            owner=owner,
-            name=name,
-            tag=tag
-        )
-    except ApiException as error:
-        if error.status == 404:
-            raise click.ClickException(f'Recipe not found: {owner}/{name}:{tag}')
-        raise click.ClickException(error)
+    cache = ctx.obj.config.get_package_cache()
+    tag, res = get_package(client, cache, 'recipe', owner, name, tag)
 
     manifest = Recipe.parse_obj(res['manifest'])
 
-    try:
-        manifest.to_folder(
-            folder_path=path,
-            readme_string=res['readme'],
-        )
-    except FileExistsError as error:
-        if not force:
+    dependencies = None
+    if with_dependencies:
+        if os.path.exists(path) and not force:
             raise click.ClickException(f'Folder already exists at path {path}. Use "--force" to overwrite it.')
+        dependencies = get_dependencies(client, cache, manifest, concurrency)
 
-        shutil.rmtree(path)
+    try:
+        write_package(
+            manifest, res['readme'], path, force=force, dependencies=dependencies
+        )
+    except FileExistsError:
+        raise click.ClickException(f'Folder already exists at path {path}. Use "--force" to overwrite it.')
 
-        manifest.to_folder(
-            folder_path=path,
-            readme_string=res['readme'],
+    if dependencies:
+        click.echo(
+            f'Recipe {owner}/{name}:{tag} saved to {path} with {len(dependencies)} '
+            'dependencies'
         )
+        return
 
     click.echo(f'Recipe {owner}/{name}:{tag} saved to {path}')
 
@@ -102,47 +333,15 @@ def plugin(name, owner, tag, path, force):
         account = client.get_account()
         owner = account.username
 
-    if tag is None:
-        try:
-            res = client.plugins.get_plugin(
-                owner=owner,
-                name=name,
-            )
-        except ApiException as error:
-            if error.status == 404:
-                raise click.ClickException(f'Plugin not found: {owner}/{name}')
-            raise click.ClickException(error)
-
-        tag = res['latest_tag']
-
-    try:
-        res = client.plugins.get_plugin_tag(
-            owner=owner,
-            name=name,
-            tag=tag
-        )
-    except ApiException as error:
-        if error.status == 404:
-            raise click.ClickException(
-                f'Plugin not found: {owner}/{name}:{tag}')
-        raise click.ClickException(error)
+    tag, res = get_package(
+        client, ctx.obj.config.get_package_cache(), 'plugin', owner, name, tag
+    )
 
     manifest = Plugin.parse_obj(res['manifest'])
 
     try:
-        manifest.to_folder(
-            folder_path=path,
-            readme_string=res['readme'],
-        )
+        write_package(manifest, res['readme'], path, force=force)
     except FileExistsError:
-        if not force:
-            raise click.ClickException(f'Folder already exists at path {path}')
-
-        shutil.rmtree(path)
-
-        manifest.to_folder(
-            folder_path=path,
-            readme_string=res['readme'],
-        )
+        raise click.ClickException(f'Folder already exists at path {path}')
 
     click.echo(f'Plugin {owner}/{name}:{tag} saved to {path}')
@@ -1,3 +1,8 @@
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple
+
 from pydantic import ValidationError
 
 from queenbee.recipe import Recipe
@@ -7,7 +12,10 @@ from queenbee.repository.package import PackageVersion
 from pollination_sdk.exceptions import ApiException
 from pollination_sdk.models import RepositoryCreate
 
+from ..cache import DiskCache
 from ..client import Client
+from ..packages import folder_fingerprint, get_package_tag, package_digest, \
+    queenbee_version
 
 try:
     import click
@@ -17,6 +25,10 @@ except ImportError:
     )
 
 
+# serializes the confirmation prompts of concurrent pushes
+_repository_lock = threading.Lock()
+
+
 def handle_repository(
     client: Client, repo_type: str, owner: str, name: str, create_repo: bool = False,
     create_public_repo: bool = True
@@ -81,6 +93,193 @@ def handle_repository(
         click.echo('Successfully created repository!')
 
 
+def load_package(
+    repo_type: str, path: str, tag: str = None, cache: DiskCache = None
+) -> dict:
+    """Load a recipe or plugin from a folder and optionally override its tag.
+
+    Args:
+        repo_type: Either recipe or plugin.
+        path: The package folder.
+        tag: A tag to use instead of the tag in the package folder.
+        cache: An optional cache of parsed manifests. Folders whose files have not
+            changed since they were last loaded with the same queenbee version are
+            not parsed again. Only the latest manifest of each folder is kept.
+
+    Returns:
+        dict -- The ``to_dict`` output of the recipe or plugin.
+    """
+    cache_key = None
+    fingerprint = None
+    manifest = None
+    if cache is not None:
+        cache_key = f'{repo_type}|{os.path.abspath(path)}'
+        fingerprint = f'{queenbee_version()}|{folder_fingerprint(path)}'
+        entry = cache.get(cache_key)
+        if entry is not None and entry.get('fingerprint') == fingerprint:
+            manifest = entry['manifest']
+
+    if manifest is None:
+        package_class = Recipe if repo_type == 'recipe' else Plugin
+        try:
+            manifest = package_class.from_folder(path).to_dict()
+        except ValidationError as error:
+            raise click.ClickException(error)
+        except FileNotFoundError as error:
+            raise click.ClickException(error)
+        except Exception as error:
+            raise error
+
+        if cache is not None:
+            cache.set(cache_key, {'fingerprint': fingerprint, 'manifest': manifest})
+
+    if tag is not None:
+        manifest['metadata']['tag'] = tag
+
+    return manifest
+
+
+def get_remote_package(client: Client, repo_type: str, owner: str, name: str, tag: str):
+    """Get a package tag from the registry or None if it does not exist.
+
+    Returns:
+        dict -- The ``manifest``, ``readme`` and ``digest`` of the tag.
+    """
+    try:
+        return get_package_tag(client, repo_type, owner, name, tag)
+    except ApiException as error:
+        if error.status == 404:
+            return None
+        raise click.ClickException(error)
+
+
+def push_package(
+    client: Client, repo_type: str, owner: str, manifest: dict, readme_string: str,
+    create_repo: bool = False, create_public_repo: bool = True
+) -> bool:
+    """Push a recipe or plugin unless the same package is already in the registry.
+
+    The digest of the local package is compared with the digest of the remote tag
+    before anything is uploaded. Pushing a tag that already exists with different
+    contents fails without sending the manifest.
+
+    Returns:
+        bool -- False if the package was already up to date.
+    """
+    name = manifest['metadata']['name']
+    tag = manifest['metadata']['tag']
+
+    remote_package = get_remote_package(client, repo_type, owner, name, tag)
+    if remote_package is not None:
+        if remote_package['digest'] != package_digest(manifest):
+            raise click.ClickException(
+                f'{repo_type.capitalize()} {owner}/{name}:{tag} already exists with '
+                'different contents. Use a new tag to push this version.'
+            )
+        if (remote_package.get('readme') or '') == readme_string:
+            return False
+    else:
+        with _repository_lock:
+            handle_repository(
+                client=client,
+                repo_type=repo_type,
+                owner=owner,
+                name=name,
+                create_repo=create_repo,
+                create_public_repo=create_public_repo
+            )
+
+    new_package = {
+        'manifest': manifest,
+        'readme': readme_string,
+    }
+
+    api = client.recipes if repo_type == 'recipe' else client.plugins
+    try:
+        getattr(api, f'create_{repo_type}_package')(
+            owner=owner,
+            name=name,
+            **{f'new_{repo_type}_package': new_package},
+        )
+    except ApiException as error:
+        raise click.ClickException(error)
+
+    return True
+
+
+def manifest_cache(ctx: click.Context) -> DiskCache:
+    """Get the cache of manifests parsed from local package folders."""
+    return DiskCache(os.path.join(ctx.obj.config.cache_directory, 'package-manifests'))
+
+
+def discover_packages(root: str) -> List[Tuple[str, str]]:
+    """Find the recipe and plugin folders under a root folder.
+
+    A folder with a ``package.yaml`` file is a plugin if it has a ``config.yaml``
+    file and a recipe if it has a ``flow`` folder. Package folders, hidden folders
+    and pulled ``.dependencies`` are not searched any further.
+
+    Returns:
+        List[Tuple[str, str]] -- A sorted list of (package type, folder) tuples.
+    """
+    packages = []
+    for folder, folder_names, file_names in os.walk(root):
+        if 'package.yaml' in file_names:
+            if 'config.yaml' in file_names:
+                packages.append(('plugin', folder))
+                folder_names.clear()
+                continue
+            if 'flow' in folder_names:
+                packages.append(('recipe', folder))
+                folder_names.clear()
+                continue
+        folder_names[:] = [name for name in folder_names if not name.startswith('.')]
+    return sorted(packages)
+
+
+def push_order(packages: Dict[str, Tuple[str, dict]]) -> Dict[str, List[str]]:
+    """Get the local packages that each package depends on.
+
+    Recipe dependencies are matched to local packages by kind and name.
+
+    Args:
+        packages: The package type and manifest of each package folder.
+
+    Returns:
+        Dict[str, List[str]] -- The folders of the local dependencies of each folder.
+    """
+    by_name = {
+        (repo_type, manifest['metadata']['name']): path
+        for path, (repo_type, manifest) in packages.items()
+    }
+    requirements = {}
+    for path, (_, manifest) in packages.items():
+        requirements[path] = []
+        for dependency in manifest.get('dependencies') or []:
+            dependency_path = by_name.get((dependency['kind'], dependency['name']))
+            if dependency_path is not None and dependency_path != path:
+                requirements[path].append(dependency_path)
+
+    # fail before anything is pushed if the dependencies can not be ordered
+    visited, active = set(), set()
+
+    def _visit(path: str):
+        if path in active:
+            raise click.ClickException(f'Circular dependency found for package at {path}')
+        if path in visited:
+            return
+        active.add(path)
+        for dependency_path in requirements[path]:
+            _visit(dependency_path)
+        active.discard(path)
+        visited.add(path)
+
+    for path in requirements:
+        _visit(path)
+
+    return requirements
+
+
 @click.group('push')
 def push():
     pass
@@ -103,7 +302,8 @@ def recipe(ctx, path, owner, tag, create_repo, public):
     """push a queenbee recipe to the pollination registry
 
     This subcommand pushes a packaged queenbee recipe to a registry on
-    pollination cloud
+    pollination cloud. Nothing is uploaded if the same recipe version is already
+    in the registry.
     """
     client = ctx.obj.get_client()
 
@@ -111,47 +311,21 @@ def recipe(ctx, path, owner, tag, create_repo, public):
         account = client.get_account()
         owner = account.username
 
-    try:
-        manifest = Recipe.from_folder(path)
-    except ValidationError as error:
-        raise click.ClickException(error)
-    except FileNotFoundError as error:
-        raise click.ClickException(error)
-    except Exception as error:
-        raise error
-
-    handle_repository(
-        client=client,
-        repo_type='recipe',
-        owner=owner,
-        name=manifest.metadata.name,
-        create_repo=create_repo,
-        create_public_repo=public
-    )
-
-    if tag is not None:
-        manifest.metadata.tag = tag
+    manifest = load_package('recipe', path, tag, cache=manifest_cache(ctx))
+    metadata = manifest['metadata']
 
     readme_string = PackageVersion.read_readme(path)
 
     if readme_string is None:
         readme_string = ''
 
-    new_package = {
-        'manifest': manifest.to_dict(),
-        'readme': readme_string,
-    }
+    if not push_package(
+        client, 'recipe', owner, manifest, readme_string, create_repo, public
+    ):
+        click.echo(f'Recipe package {owner}/{metadata["name"]}:{metadata["tag"]} is already up to date')
+        return
 
-    try:
-        client.recipes.create_recipe_package(
-            owner=owner,
-            name=manifest.metadata.name,
-            new_recipe_package=new_package,
-        )
-    except ApiException as error:
-        raise click.ClickException(error)
-
-    click.echo(f'Successfully created new recipe package {owner}/{manifest.metadata.name}:{manifest.metadata.tag}')
+    click.echo(f'Successfully created new recipe package {owner}/{metadata["name"]}:{metadata["tag"]}')
 
 
 @push.command('plugin')
@@ -171,7 +345,8 @@ def plugin(ctx, path, owner, tag, create_repo, public):
     """push a queenbee plugin to the pollination registry
 
     This subcommand pushes a packaged queenbee plugin to a registry on
-    pollination cloud
+    pollination cloud. Nothing is uploaded if the same plugin version is already
+    in the registry.
     """
     client = ctx.obj.get_client()
 
@@ -179,45 +354,111 @@ def plugin(ctx, path, owner, tag, create_repo, public):
         account = client.get_account()
         owner = account.username
 
-    try:
-        manifest = Plugin.from_folder(path)
-    except ValidationError as error:
-        raise click.ClickException(error)
-    except FileNotFoundError as error:
-        raise click.ClickException(error)
-    except Exception as error:
-        raise error
-
-    handle_repository(
-        client=client,
-        repo_type='plugin',
-        owner=owner,
-        name=manifest.metadata.name,
-        create_repo=create_repo,
-        create_public_repo=public
-    )
-
-    if tag is not None:
-        manifest.metadata.tag = tag
+    manifest = load_package('plugin', path, tag, cache=manifest_cache(ctx))
+    metadata = manifest['metadata']
 
     readme_string = PackageVersion.read_readme(path)
 
     if readme_string is None:
         readme_string = ''
 
-    new_package = {
-        'manifest': manifest.to_dict(),
-        'readme': readme_string,
-    }
+    if not push_package(
+        client, 'plugin', owner, manifest, readme_string, create_repo, public
+    ):
+        click.echo(
+            f'Plugin package {owner}/{metadata["name"]}:{metadata["tag"]} is already up to date')
+        return
 
-    try:
-        client.plugins.create_plugin_package(
-            owner=owner,
-            name=manifest.metadata.name,
-            new_plugin_package=new_package,
+    click.echo(
+        f'Successfully created new plugin package {owner}/{metadata["name"]}:{metadata["tag"]}')
+
+
+@push.command('all')
+@click.argument('root', type=click.Path(exists=True, file_okay=False), default='.')
+@click.option('-o', '--owner', help='a pollination account name')
+@click.option(
+    '--create-repo', help='create the repositories that do not exist',
+    type=bool, default=False, is_flag=True)
+@click.option(
+    '--public/--private', help='Indicate if new repositories should be created as public '
+    'or private repositories. This option does not change the visibility of existing '
+    'repositories.', is_flag=True, default=True
+)
+@click.option(
+    '--concurrency', help='maximum number of packages to push at the same time',
+    type=click.IntRange(min=1), default=4, show_default=True)
+@click.pass_context
+def push_all(ctx, root, owner, create_repo, public, concurrency):
+    """push every queenbee recipe and plugin under a folder
+
+    Packages are pushed after the local plugins and recipes they depend on. Packages
+    that do not depend on each other are pushed at the same time and packages that
+    are already in the registry are skipped.
+    """
+    client = ctx.obj.get_client()
+
+    if owner is None:
+        account = client.get_account()
+        owner = account.username
+
+    packages = discover_packages(root)
+    if not packages:
+        raise click.ClickException(f'No recipes or plugins found in {root}')
+
+    cache = manifest_cache(ctx)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        manifests = dict(zip(
+            [path for _, path in packages],
+            executor.map(
+                lambda package: (package[0], load_package(*package, cache=cache)),
+                packages
+            ),
+        ))
+    requirements = push_order(manifests)
+
+    def _push(path: str) -> bool:
+        repo_type, manifest = manifests[path]
+        readme_string = PackageVersion.read_readme(path) or ''
+        return push_package(
+            client, repo_type, owner, manifest, readme_string, create_repo, public
         )
-    except ApiException as error:
-        raise click.ClickException(error)
 
-    click.echo(
-        f'Successfully created new plugin package {owner}/{manifest.metadata.name}:{manifest.metadata.tag}')
+    def _name(path: str) -> str:
+        _, manifest = manifests[path]
+        return f'{owner}/{manifest["metadata"]["name"]}:{manifest["metadata"]["tag"]}'
+
+    failed = set()
+    done = set()
+    pending = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while len(done) + len(failed) < len(manifests):
+            for path in manifests:
+                if path in done or path in failed or path in pending.values():
+                    continue
+                if any(dependency in failed for dependency in requirements[path]):
+                    failed.add(path)
+                    click.echo(f'Skipped {_name(path)}: a dependency failed to push')
+                elif all(dependency in done for dependency in requirements[path]):
+                    pending[executor.submit(_push, path)] = path
+            if not pending:
+                continue
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = pending.pop(future)
+                try:
+                    pushed = future.result()
+                except click.ClickException as error:
+                    failed.add(path)
+                    click.echo(f'Failed to push {_name(path)}: {error.format_message()}')
+                    continue
+                done.add(path)
+                if pushed:
+                    click.echo(f'Pushed {_name(path)}')
+                else:
+                    click.echo(f'{_name(path)} is already up to date')
+
+    if failed:
+        raise click.ClickException(
+            f'Failed to push {len(failed)} of {len(manifests)} packages'
+        )
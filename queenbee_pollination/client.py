@@ -1,23 +1,116 @@
+"""queenbee_pollination library."""
+import hashlib
+import json
+import os
+import types
+
 import pollination_sdk as sdk
+from pollination_sdk.rest import RESTClientObject
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import DiskCache
 
 
 class Client(object):
-    """A Pollination client designed to interact with Workflow and Simulation objects."""
+    """A Pollination client designed to interact with Workflow and Simulation objects.
+
+    All API groups share a single ``sdk.ApiClient`` and therefore a single urllib3
+    connection pool. Calls to presigned storage URLs should go through ``session``
+    so that they re-use the same keep-alive connections.
 
-    def __init__(self, api_token=None, access_token=None, host='https://api.pollination.solutions'):
+    Args:
+        api_token: A Pollination API token.
+        access_token: A JWT access token.
+        host: The Pollination API endpoint.
+        pool_maxsize: Maximum number of connections kept open per host.
+        pool_connections: Number of distinct hosts to keep connection pools for.
+        keep_alive: Re-use connections between requests. Set to False to close
+            each connection once its request completes.
+        cache_directory: A folder used to cache the account details returned by
+            ``get_account``. Account details are not cached if this is None.
+        account_cache_ttl: Number of seconds to keep the cached account details.
+    """
+
+    def __init__(
+        self, api_token=None, access_token=None, host='https://api.pollination.solutions',
+        pool_maxsize=16, pool_connections=4, keep_alive=True, cache_directory=None,
+        account_cache_ttl=3600
+    ):
         config = sdk.Configuration(
             api_key={'APIKeyAuth': api_token}
         )
         config.access_token = access_token
         config.host = host
+        config.connection_pool_maxsize = pool_maxsize
 
         self.config = config
-        self.auth = sdk.UserApi(sdk.ApiClient(config))
-        self.recipes = sdk.RecipesApi(sdk.ApiClient(config))
-        self.plugins = sdk.PluginsApi(sdk.ApiClient(config))
-        self.runs = sdk.RunsApi(sdk.ApiClient(config))
-        self.artifacts = sdk.ArtifactsApi(sdk.ApiClient(config))
-        self.projects = sdk.ProjectsApi(sdk.ApiClient(config))
-
-    def get_account(self) -> sdk.models.UserPrivate:
-        return self.auth.get_me()
+
+        api_client = sdk.ApiClient(config)
+        api_client.rest_client = RESTClientObject(
+            config, pools_size=pool_connections, maxsize=pool_maxsize
+        )
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        if not keep_alive:
+            api_client.set_default_header('Connection', 'close')
+            session.headers['Connection'] = 'close'
+
+        self.api_client = api_client
+        self.session = session
+
+        self.auth = sdk.UserApi(api_client)
+        self.recipes = sdk.RecipesApi(api_client)
+        self.plugins = sdk.PluginsApi(api_client)
+        self.runs = sdk.RunsApi(api_client)
+        self.artifacts = sdk.ArtifactsApi(api_client)
+        self.projects = sdk.ProjectsApi(api_client)
+
+        self._account_cache = None
+        self._account_cache_key = None
+        token = api_token or access_token
+        if cache_directory is not None and token is not None:
+            self._account_cache = DiskCache(
+                os.path.join(cache_directory, 'accounts'), ttl=account_cache_ttl
+            )
+            token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
+            self._account_cache_key = f'{host}|{token_hash}'
+
+    def get_account(self, use_cache: bool = True) -> sdk.models.UserPrivate:
+        """Get the account that the client is authenticated as.
+
+        Args:
+            use_cache: Return the cached account details if they have not expired.
+        """
+        if self._account_cache is None:
+            return self.auth.get_me()
+
+        if use_cache:
+            data = self._account_cache.get(self._account_cache_key)
+            if data is not None:
+                response = types.SimpleNamespace(data=json.dumps(data))
+                return self.api_client.deserialize(response, 'UserPrivate')
+
+        account = self.auth.get_me()
+        self._account_cache.set(
+            self._account_cache_key, self.api_client.sanitize_for_serialization(account)
+        )
+        return account
+
+    def invalidate_account_cache(self):
+        """Remove the cached account details for this client's endpoint and token."""
+        if self._account_cache is not None:
+            self._account_cache.delete(self._account_cache_key)
+
+    def close(self):
+        """Release the pooled connections held by this client."""
+        self.session.close()
+        self.api_client.rest_client.pool_manager.clear()
+        self.api_client.close()
@@ -1,6 +1,33 @@
+import base64
+import json
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from pydantic import BaseSettings, Field
 
-from .client import Client
+if TYPE_CHECKING:
+    from .client import Client
+    from .packages import PackageCache
+
+
+@lru_cache(maxsize=32)
+def jwt_expiry(token: str) -> float:
+    """Get the expiry timestamp of a JWT token or None if it can not be decoded."""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def jwt_expires_soon(token: str, margin: float = 60) -> bool:
+    """Check if a JWT token expires within a number of seconds."""
+    expiry = jwt_expiry(token)
+    return expiry is not None and expiry - margin <= time.time()
 
 
 class Config(BaseSettings):
@@ -22,16 +49,77 @@ class Config(BaseSettings):
         description='The JWT token used too authenticate to the API',
     )
 
-    def get_client(self) -> Client:
-        try:
-            return Client(
-                api_token=self.token,
-                access_token=self.jwt_token,
-                host=self.endpoint,
-            )
-        except ValueError as error:
-            # Catch stale JWT error
-            return Client(
-                api_token=self.token,
-                host=self.endpoint,
-            )
+    pool_maxsize: int = Field(
+        16,
+        description='The maximum number of connections to keep open per host. This '
+        'limit is shared by API calls and artifact uploads/downloads.',
+        env='POLLINATION_POOL_MAXSIZE',
+    )
+
+    pool_connections: int = Field(
+        4,
+        description='The number of hosts to keep a connection pool for',
+        env='POLLINATION_POOL_CONNECTIONS',
+    )
+
+    keep_alive: bool = Field(
+        True,
+        description='Re-use HTTP connections between requests',
+        env='POLLINATION_KEEP_ALIVE',
+    )
+
+    cache_directory: str = Field(
+        os.path.join(Path.home(), '.queenbee', 'pollination'),
+        description='The folder used to store local caches and sync manifests',
+        env='POLLINATION_CACHE_DIR',
+    )
+
+    account_cache_ttl: int = Field(
+        3600,
+        description='Number of seconds to cache the details of the logged in account',
+        env='POLLINATION_ACCOUNT_CACHE_TTL',
+    )
+
+    package_cache_size: int = Field(
+        512 * 1024 * 1024,
+        description='Maximum number of bytes used to cache pulled recipes and plugins',
+        env='POLLINATION_PACKAGE_CACHE_SIZE',
+    )
+
+    latest_tag_ttl: int = Field(
+        60,
+        description='Number of seconds to cache the latest tag of a recipe or plugin',
+        env='POLLINATION_LATEST_TAG_TTL',
+    )
+
+    def get_package_cache(self) -> 'PackageCache':
+        from .packages import PackageCache
+
+        return PackageCache(
+            os.path.join(self.cache_directory, 'packages'),
+            max_size=self.package_cache_size,
+            latest_ttl=self.latest_tag_ttl,
+        )
+
+    def get_client(self) -> 'Client':
+        # the SDK is only imported once a command needs a client
+        from .client import Client
+
+        client_options = {
+            'pool_maxsize': self.pool_maxsize,
+            'pool_connections': self.pool_connections,
+            'keep_alive': self.keep_alive,
+            'cache_directory': self.cache_directory,
+            'account_cache_ttl': self.account_cache_ttl,
+        }
+        access_token = self.jwt_token
+        if access_token is not None and jwt_expires_soon(access_token, margin=0):
+            # a stale JWT would be rejected so only use the API token
+            access_token = None
+
+        return Client(
+            api_token=self.token,
+            access_token=access_token,
+            host=self.endpoint,
+            **client_options,
+        )
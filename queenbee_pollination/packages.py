@@ -0,0 +1,167 @@
+"""Helpers to cache and compare recipe and plugin packages."""
+import hashlib
+import json
+import os
+import tempfile
+
+from .cache import DiskCache
+from .transfer import PathFilter, artifact_key, file_digest, scan_files
+
+
+def package_digest(manifest: dict) -> str:
+    """Get the digest of a recipe or plugin from its ``to_dict`` output.
+
+    This is the same digest that queenbee calculates for a package.
+    """
+    return hashlib.sha256(json.dumps(manifest).encode('utf-8')).hexdigest()
+
+
+def get_package_tag(client, repo_type: str, owner: str, name: str, tag: str) -> dict:
+    """Get a recipe or plugin tag from the registry as a dictionary.
+
+    The tag is requested without deserializing the response since the inputs and
+    outputs of a recipe are unions that the SDK models can not represent, and the
+    SDK recipe model leaves out the flow and dependencies of the recipe.
+
+    Returns:
+        dict -- The ``manifest``, ``readme`` and ``digest`` of the tag.
+    """
+    api = client.recipes if repo_type == 'recipe' else client.plugins
+    res = getattr(api, f'get_{repo_type}_by_tag')(
+        owner=owner, name=name, tag=tag, _preload_content=False
+    )
+    try:
+        return json.loads(res.data)
+    finally:
+        res.release_conn()
+
+
+def queenbee_version() -> str:
+    """Get the installed version of queenbee."""
+    try:
+        from importlib.metadata import version
+    except ImportError:
+        # Python 3.7
+        from pkg_resources import get_distribution
+        return get_distribution('queenbee').version
+    return version('queenbee')
+
+
+def folder_fingerprint(folder_path: str) -> str:
+    """Get a digest of the paths, modification times and contents of a folder.
+
+    Hidden files and folders such as ``.dependencies`` are ignored.
+    """
+    digest = hashlib.sha256()
+    file_paths = sorted(scan_files(folder_path, PathFilter(exclude=['.*'])))
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        key = artifact_key(os.path.relpath(file_path, folder_path))
+        digest.update(
+            f'{key}\0{stat.st_mtime_ns}\0{file_digest(file_path)}\n'.encode('utf-8')
+        )
+    return digest.hexdigest()
+
+
+class PackageCache(object):
+    """A size-bounded, content-addressed cache of package manifests.
+
+    Package contents are stored once per sha256 digest under ``blobs`` and each
+    ``owner/name:tag`` points at the digest of its contents. Tags are immutable so
+    these pointers never expire. The latest tag of a package is cached for
+    ``latest_ttl`` seconds. Once the blobs take more than ``max_size`` bytes the
+    least recently used ones are removed.
+
+    Args:
+        directory: The folder to store the cache in.
+        max_size: Maximum number of bytes used by cached packages.
+        latest_ttl: Number of seconds to cache the latest tag of a package.
+    """
+
+    def __init__(
+        self, directory: str, max_size: int = 512 * 1024 * 1024, latest_ttl: float = 60
+    ):
+        self.directory = directory
+        self.max_size = max_size
+        self.blobs_directory = os.path.join(directory, 'blobs')
+        self.tags = DiskCache(os.path.join(directory, 'tags'))
+        self.latest = DiskCache(os.path.join(directory, 'latest'), ttl=latest_ttl)
+
+    @staticmethod
+    def key(host: str, kind: str, owner: str, name: str, tag: str = None) -> str:
+        """Get the cache key of a package or of a package tag."""
+        key = f'{host}|{kind}|{owner}/{name}'
+        return key if tag is None else f'{key}:{tag}'
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blobs_directory, f'{digest}.json')
+
+    def get_latest_tag(self, key: str) -> str:
+        """Get the cached latest tag of a package or None if it has expired."""
+        return self.latest.get(key)
+
+    def set_latest_tag(self, key: str, tag: str):
+        self.latest.set(key, tag)
+
+    def get(self, key: str) -> dict:
+        """Get a cached package or None if it is not cached."""
+        digest = self.tags.get(key)
+        if digest is None:
+            return None
+        blob_path = self._blob_path(digest)
+        try:
+            with open(blob_path) as f:
+                package = json.load(f)
+            # mark the blob as recently used
+            os.utime(blob_path)
+        except (OSError, ValueError):
+            return None
+        return package
+
+    def set(self, key: str, package: dict) -> str:
+        """Cache a JSON serializable package.
+
+        Returns:
+            str -- The digest that the package is stored under.
+        """
+        data = json.dumps(package, sort_keys=True).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        if os.path.isfile(blob_path):
+            os.utime(blob_path)
+        else:
+            os.makedirs(self.blobs_directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.blobs_directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, blob_path)
+        self.tags.set(key, digest)
+        self.evict()
+        return digest
+
+    def evict(self):
+        """Remove the least recently used packages until the cache fits in max_size."""
+        blobs = []
+        try:
+            with os.scandir(self.blobs_directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.json'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        # removed by another process
+                        continue
+                    blobs.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        total_size = sum(size for _, size, _ in blobs)
+        for _, size, blob_path in sorted(blobs):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(blob_path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
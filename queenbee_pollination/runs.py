@@ -0,0 +1,480 @@
+"""Helpers to query the runs of a Pollination project."""
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from pollination_sdk import models
+
+from .client import Client
+from .transfer import ConcurrencyLimiter, artifact_key
+
+
+# run statuses that are expected to change. The SDK lists "Running", "Succeeded",
+# "Failed" and "Error" for ``JobStatus.status``. Any status that is not known to be
+# active is treated as final so an unexpected value can not keep a watch running.
+ACTIVE_STATUSES = ('Running',)
+# run outputs that are stored as files or folders in the run folder
+ARTIFACT_OUTPUTS = ('StepFileOutput', 'StepFolderOutput', 'StepPathOutput')
+
+
+def as_utc(value: datetime) -> datetime:
+    """Convert a datetime to UTC. Naive datetimes are assumed to be in UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def run_row(run: models.Run) -> dict:
+    """Get a flat dictionary with the ID, status and timing of a run."""
+    return {
+        'id': run.status.id,
+        'status': run.status.status,
+        'started_at': run.status.started_at,
+        'finished_at': run.status.finished_at,
+    }
+
+
+def run_outputs(client: Client, owner: str, name: str, run_id: str) -> List[dict]:
+    """Get the outputs of a run as dictionaries.
+
+    The run is requested without deserializing the response since the output
+    types are a union that the SDK models can not represent.
+
+    Returns:
+        List[dict] -- The outputs of the run with their ``name``, ``type`` and
+        ``path`` in the run folder.
+    """
+    res = client.runs.get_run(
+        owner=owner, name=name, run_id=run_id, _preload_content=False
+    )
+    try:
+        data = json.loads(res.data)
+    finally:
+        res.release_conn()
+    return (data.get('status') or {}).get('outputs') or []
+
+
+def artifact_paths(outputs: List[dict], names: List[str] = None) -> Dict[str, str]:
+    """Get the run folder paths of the file and folder outputs of a run.
+
+    Outputs that are inside the folder of another selected output are left out so
+    that no file is downloaded twice.
+
+    Args:
+        outputs: The outputs of a run as returned by ``run_outputs``.
+        names: The names of the outputs to select. Defaults to all the file and
+            folder outputs.
+
+    Returns:
+        Dict[str, str] -- The selected paths by output name.
+    """
+    by_name = {output['name']: output for output in outputs}
+    if names:
+        missing = [output_name for output_name in names if output_name not in by_name]
+        if missing:
+            raise ValueError(f'Unknown outputs: {", ".join(missing)}')
+        selected = [by_name[output_name] for output_name in names]
+        invalid = [
+            output['name'] for output in selected
+            if output.get('type') not in ARTIFACT_OUTPUTS
+        ]
+        if invalid:
+            raise ValueError(f'Outputs are not files or folders: {", ".join(invalid)}')
+    else:
+        selected = [
+            output for output in outputs if output.get('type') in ARTIFACT_OUTPUTS
+        ]
+
+    paths = {
+        output['name']: artifact_key(output['path']).strip('/')
+        for output in selected
+    }
+    return {
+        output_name: path for output_name, path in paths.items()
+        if not any(
+            path.startswith(f'{other}/') or (path == other and other_name < output_name)
+            for other_name, other in paths.items() if other_name != output_name
+        )
+    }
+
+
+def iter_runs(
+    client: Client, owner: str, name: str, status: str = None, page: int = 1,
+    per_page: int = 25, all_pages: bool = False, prefetch: int = 4
+) -> Iterator[models.Run]:
+    """Iterate over the runs in a project page by page.
+
+    When iterating over all pages the next ``prefetch`` pages are requested
+    concurrently while the runs of the current page are consumed. Runs are always
+    yielded in page order and no more pages are requested once the iterator is
+    closed.
+
+    Args:
+        client: A Pollination client.
+        owner: The project owner.
+        name: The project name.
+        status: Only return runs with this status.
+        page: The page to start from.
+        per_page: Number of runs to request per page.
+        all_pages: Continue with the following pages until the last one.
+        prefetch: Number of pages to request ahead of the current page.
+    """
+    def _fetch(page_number: int) -> models.RunList:
+        kwargs = {'page': page_number, 'per_page': per_page}
+        if status is not None:
+            kwargs['status'] = status
+        return client.runs.list_runs(owner=owner, name=name, **kwargs)
+
+    first_page = _fetch(page)
+    yield from first_page.resources
+
+    if not all_pages:
+        return
+
+    last_page = first_page.page_count or page
+    next_page = page + 1
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(prefetch, 1)) as executor:
+        try:
+            while pending or next_page <= last_page:
+                while next_page <= last_page and len(pending) < max(prefetch, 1):
+                    pending.append(executor.submit(_fetch, next_page))
+                    next_page += 1
+                yield from pending.popleft().result().resources
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def fetch_runs(
+    client: Client, owner: str, name: str, run_ids: List[str], batch_size: int = 50,
+    limiter: ConcurrencyLimiter = None
+) -> Dict[str, models.Run]:
+    """Get the latest state of many runs with one ``list_runs`` request per batch.
+
+    Batches are requested concurrently. Throttled requests are retried by the
+    limiter.
+
+    Args:
+        client: A Pollination client.
+        owner: The project owner.
+        name: The project name.
+        run_ids: The IDs of the runs to get.
+        batch_size: Maximum number of run IDs to request per page.
+        limiter: A limiter shared by all requests. Defaults to 4 concurrent requests.
+
+    Returns:
+        Dict[str, models.Run] -- The runs that were found by their ID.
+    """
+    limiter = limiter or ConcurrencyLimiter(4)
+    batches = [
+        run_ids[index:index + batch_size] for index in range(0, len(run_ids), batch_size)
+    ]
+
+    def _fetch(batch: List[str]) -> List[models.Run]:
+        return limiter.call(
+            lambda: client.runs.list_runs(
+                owner=owner, name=name, ids=batch, per_page=len(batch)
+            )
+        ).resources
+
+    runs = {}
+    with ThreadPoolExecutor(max_workers=max(limiter.max_limit, 1)) as executor:
+        for resources in executor.map(_fetch, batches):
+            runs.update((run.status.id, run) for run in resources)
+    return runs
+
+
+def watch_runs(
+    client: Client, owner: str, name: str, run_ids: List[str], interval: float = 5,
+    max_interval: float = 60, timeout: float = None, batch_size: int = 50,
+    limiter: ConcurrencyLimiter = None,
+    on_change: Callable[[models.Run, str], None] = None
+) -> Dict[str, models.Run]:
+    """Poll a set of runs until none of them is active anymore.
+
+    Only runs that are still active are requested on each poll. The polling
+    interval grows by half every time nothing changed, up to ``max_interval``, and
+    goes back to ``interval`` as soon as a run changes status.
+
+    Args:
+        client: A Pollination client.
+        owner: The project owner.
+        name: The project name.
+        run_ids: The IDs of the runs to watch.
+        interval: Initial number of seconds between polls.
+        max_interval: Maximum number of seconds between polls.
+        timeout: Stop watching after this number of seconds. Runs that are still
+            active are returned with their latest status.
+        batch_size: Maximum number of run IDs to request per page.
+        limiter: A limiter shared by all requests.
+        on_change: A function that is called with a run and its previous status
+            every time the status of a run changes. The previous status is None on
+            the first poll.
+
+    Returns:
+        Dict[str, models.Run] -- The latest state of each run by its ID.
+    """
+    run_ids = list(dict.fromkeys(run_ids))
+    runs = fetch_runs(client, owner, name, run_ids, batch_size, limiter)
+    missing = [run_id for run_id in run_ids if run_id not in runs]
+    if missing:
+        raise ValueError(f'Runs not found in {owner}/{name}: {", ".join(missing)}')
+
+    statuses = {run_id: runs[run_id].status.status for run_id in run_ids}
+    if on_change is not None:
+        for run_id in run_ids:
+            on_change(runs[run_id], None)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    wait = interval
+    while True:
+        active = [
+            run_id for run_id in run_ids if statuses[run_id] in ACTIVE_STATUSES
+        ]
+        if not active:
+            break
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait = min(wait, remaining)
+        time.sleep(wait)
+
+        changed = False
+        for run_id, run in fetch_runs(
+            client, owner, name, active, batch_size, limiter
+        ).items():
+            runs[run_id] = run
+            previous = statuses[run_id]
+            if run.status.status != previous:
+                statuses[run_id] = run.status.status
+                changed = True
+                if on_change is not None:
+                    on_change(run, previous)
+
+        wait = interval if changed else min(wait * 1.5, max_interval)
+
+    return {run_id: runs[run_id] for run_id in run_ids}
+
+
+class RunIndex(object):
+    """A local SQLite index of the runs in Pollination projects.
+
+    The index stores the ID, status and timing of every run returned by
+    ``list_runs`` so that filtered and sorted queries can be answered locally.
+    ``refresh`` only requests the pages with runs that started after the latest
+    indexed run and then updates the runs that were still active.
+
+    Args:
+        path: Path to the SQLite database file.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS runs ('
+            'owner TEXT, project TEXT, id TEXT, status TEXT, started_at REAL, '
+            'finished_at REAL, PRIMARY KEY (owner, project, id))'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS runs_started_at '
+            'ON runs (owner, project, started_at)'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS syncs ('
+            'owner TEXT, project TEXT, synced_at REAL, PRIMARY KEY (owner, project))'
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _timestamp(value: datetime) -> float:
+        value = as_utc(value)
+        return None if value is None else value.timestamp()
+
+    @staticmethod
+    def _datetime(value: float) -> datetime:
+        return None if value is None else datetime.fromtimestamp(value, timezone.utc)
+
+    def _upsert(self, owner: str, project: str, runs: List[models.Run]):
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)',
+            [
+                (
+                    owner, project, row['id'], row['status'],
+                    self._timestamp(row['started_at']),
+                    self._timestamp(row['finished_at']),
+                )
+                for row in (run_row(run) for run in runs)
+            ]
+        )
+
+    @staticmethod
+    def _newest_first(runs: List[models.Run]) -> bool:
+        """Check if a page of runs is sorted from the newest to the oldest run.
+
+        Returns None if the order can not be told from the start times of the runs.
+        """
+        started = [
+            as_utc(run.status.started_at) for run in runs
+            if run.status.started_at is not None
+        ]
+        if len(started) < 2 or started[0] == started[-1]:
+            return None
+        return started[0] > started[-1]
+
+    def last_synced(self, owner: str, project: str) -> datetime:
+        """Get the last time the runs of a project were synced to the index."""
+        res = self.connection.execute(
+            'SELECT synced_at FROM syncs WHERE owner = ? AND project = ?',
+            (owner, project)
+        ).fetchone()
+        return None if res is None else self._datetime(res[0])
+
+    def refresh(
+        self, client: Client, owner: str, project: str, per_page: int = 100,
+        batch_size: int = 50
+    ) -> Tuple[int, int]:
+        """Sync the index with the runs of a project.
+
+        The order that the server lists runs in is detected from the start times on
+        the first page. Pages are then requested from the newest runs onwards until
+        a page reaches a run that started before the latest run in the index. If the
+        order can not be detected, or the index is empty, every page is requested.
+        Runs that were indexed with an active status are then updated in batches.
+
+        Returns:
+            int -- The number of new runs.
+            int -- The number of indexed runs with a new status.
+        """
+        synced_at = time.time()
+        known = {
+            row[0]: row[1] for row in self.connection.execute(
+                'SELECT id, status FROM runs WHERE owner = ? AND project = ?',
+                (owner, project)
+            )
+        }
+        high_water = self.connection.execute(
+            'SELECT MAX(started_at) FROM runs WHERE owner = ? AND project = ?',
+            (owner, project)
+        ).fetchone()[0]
+
+        added = 0
+        changed = 0
+        seen = set()
+
+        def _index(runs: List[models.Run]):
+            nonlocal added, changed
+            for run in runs:
+                run_id = run.status.id
+                status = known.get(run_id)
+                if status is None:
+                    # a run can show up on two pages if runs are added meanwhile
+                    if run_id not in seen:
+                        added += 1
+                elif status != run.status.status and run_id not in seen:
+                    changed += 1
+                seen.add(run_id)
+            self._upsert(owner, project, runs)
+
+        def _fetch(page: int) -> List[models.Run]:
+            runs = client.runs.list_runs(
+                owner=owner, name=project, page=page, per_page=per_page
+            )
+            _index(runs.resources)
+            return runs
+
+        def _reached_index(runs: List[models.Run]) -> bool:
+            """Check if a page holds a run that started before the last sync."""
+            return high_water is not None and any(
+                started_at is not None and started_at <= high_water
+                for started_at in (self._timestamp(run.status.started_at) for run in runs)
+            )
+
+        first_page = _fetch(1)
+        last_page = first_page.page_count or 1
+        newest_first = self._newest_first(first_page.resources)
+        if newest_first is None or high_water is None:
+            pages = range(2, last_page + 1)
+        elif newest_first:
+            pages = [] if _reached_index(first_page.resources) \
+                else range(2, last_page + 1)
+        else:
+            pages = range(last_page, 1, -1)
+
+        for page in pages:
+            res = _fetch(page)
+            if newest_first is not None and _reached_index(res.resources):
+                break
+
+        active = [
+            run_id for run_id, status in known.items()
+            if status in ACTIVE_STATUSES and run_id not in seen
+        ]
+        for index in range(0, len(active), batch_size):
+            batch = active[index:index + batch_size]
+            res = client.runs.list_runs(
+                owner=owner, name=project, ids=batch, per_page=len(batch)
+            )
+            _index(res.resources)
+
+        self.connection.execute(
+            'INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)', (owner, project, synced_at)
+        )
+        self.connection.commit()
+        return added, changed
+
+    def query(
+        self, owner: str, project: str, status: str = None, since: datetime = None,
+        until: datetime = None, limit: int = None, oldest_first: bool = False
+    ) -> List[dict]:
+        """Get the indexed runs of a project sorted by start time.
+
+        Returns:
+            List[dict] -- A list of rows in the same format as ``run_row``.
+        """
+        sql = 'SELECT id, status, started_at, finished_at FROM runs ' \
+            'WHERE owner = ? AND project = ?'
+        params = [owner, project]
+        if status is not None:
+            sql += ' AND status = ?'
+            params.append(status)
+        if since is not None:
+            sql += ' AND started_at >= ?'
+            params.append(self._timestamp(since))
+        if until is not None:
+            sql += ' AND started_at < ?'
+            params.append(self._timestamp(until))
+        sql += f' ORDER BY started_at {"ASC" if oldest_first else "DESC"}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        return [
+            {
+                'id': run_id,
+                'status': run_status,
+                'started_at': self._datetime(started_at),
+                'finished_at': self._datetime(finished_at),
+            }
+            for run_id, run_status, started_at, finished_at
+            in self.connection.execute(sql, params)
+        ]
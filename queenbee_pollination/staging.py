@@ -0,0 +1,153 @@
+"""Stage the local inputs of a job in a content-addressed project folder."""
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from queenbee.io.artifact_source import ProjectFolder
+from queenbee.io.inputs.job import JobPathArgument
+from queenbee.job import Job
+
+from .transfer import artifact_key, file_digest, map_bounded, scan_files
+
+
+# project folder that staged inputs are uploaded to
+STAGING_FOLDER = '.cas'
+# file that is uploaded once every file of a staged folder is uploaded
+COMPLETE_MARKER = '.complete'
+
+
+def folder_digest(folder_path: str, digest_file: Callable[[str], str] = file_digest) -> str:
+    """Calculate a sha256 digest of the relative paths and contents of a folder."""
+    files = sorted(
+        (artifact_key(os.path.relpath(file_path, folder_path)), file_path)
+        for file_path in scan_files(folder_path)
+    )
+    digest = hashlib.sha256()
+    for key, file_path in files:
+        digest.update(f'{key}\0{digest_file(file_path)}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class InputStager(object):
+    """Upload the local file and folder arguments of jobs to content-addressed keys.
+
+    Every ``ProjectFolder`` argument whose path exists on the local machine is hashed
+    and uploaded to ``.cas/<digest>/<name>`` in the project, and the job is
+    rewritten to point at that key. Inputs that are shared by many jobs are hashed
+    and uploaded once, and inputs that were staged by an earlier submission are not
+    uploaded again. Stagers are safe to share between threads.
+
+    Args:
+        upload: A function that takes a local file path and an artifact key and
+            uploads the file.
+        list_folder: A function that takes an artifact key and returns the keys of
+            the files in that project folder or an empty list if it does not exist.
+        max_workers: Maximum number of files of a folder to upload at the same time.
+    """
+
+    def __init__(
+        self, upload: Callable[[str, str], None],
+        list_folder: Callable[[str], List[str]], max_workers: int = 8
+    ):
+        self.upload = upload
+        self.list_folder = list_folder
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._digests: Dict[tuple, Future] = {}
+        self._staged: Dict[str, Future] = {}
+
+    def _once(self, cache: dict, key, func: Callable):
+        """Call a function once per key and share its result between threads."""
+        with self._lock:
+            future = cache.get(key)
+            owner = future is None
+            if owner:
+                future = cache[key] = Future()
+        if owner:
+            try:
+                future.set_result(func())
+            except BaseException as error:
+                future.set_exception(error)
+        return future.result()
+
+    def _file_digest(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        return self._once(
+            self._digests, (os.path.realpath(file_path), stat.st_size, stat.st_mtime),
+            lambda: file_digest(file_path)
+        )
+
+    def digest(self, path: str) -> str:
+        """Get the digest of a local file or folder."""
+        if os.path.isdir(path):
+            return self._once(
+                self._digests, os.path.realpath(path),
+                lambda: folder_digest(path, self._file_digest)
+            )
+        return self._file_digest(path)
+
+    def _upload_folder(self, folder_path: str, key: str):
+        def _upload(file_path: str):
+            relative_key = artifact_key(os.path.relpath(file_path, folder_path))
+            self.upload(file_path, f'{key}/{relative_key}')
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for _ in map_bounded(
+                executor, _upload, scan_files(folder_path), self.max_workers * 2
+            ):
+                pass
+
+    def _stage(self, path: str, key: str):
+        folder_key = os.path.dirname(key)
+        is_folder = os.path.isdir(path)
+        complete_key = f'{folder_key}/{COMPLETE_MARKER}' if is_folder else key
+        if complete_key in self.list_folder(folder_key):
+            return
+
+        if not is_folder:
+            self.upload(path, key)
+            return
+
+        self._upload_folder(path, key)
+        # mark the folder as complete so a partial upload is not re-used
+        fd, marker_path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.upload(marker_path, complete_key)
+        finally:
+            os.remove(marker_path)
+
+    def stage_path(self, path: str) -> str:
+        """Upload a local file or folder unless it is already staged.
+
+        Returns:
+            str -- The artifact key of the staged file or folder.
+        """
+        name = os.path.basename(os.path.normpath(path))
+        key = f'{STAGING_FOLDER}/{self.digest(path)}/{name}'
+        self._once(self._staged, key, lambda: self._stage(path, key))
+        return key
+
+    def stage(self, job: Job, base_folder: str = '.') -> Job:
+        """Stage the local inputs of a job.
+
+        Args:
+            job: A queenbee job.
+            base_folder: The folder that relative input paths are resolved from.
+
+        Returns:
+            Job -- A copy of the job that points at the staged inputs.
+        """
+        job = job.copy(deep=True)
+        for arguments in job.arguments or []:
+            for argument in arguments:
+                if not isinstance(argument, JobPathArgument) \
+                        or not isinstance(argument.source, ProjectFolder):
+                    continue
+                local_path = os.path.join(base_folder, argument.source.path)
+                if os.path.exists(local_path):
+                    argument.source.path = self.stage_path(local_path)
+        return job
@@ -0,0 +1,840 @@
+"""Helpers to move artifacts between a local folder and a Pollination project."""
+import hashlib
+import json
+import os
+import random
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, \
+    as_completed, wait
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+import requests
+
+# status codes that indicate the server or storage is overloaded
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# status codes that indicate a request was rejected before it was handled. Only
+# these are safe to retry for requests that are not idempotent.
+THROTTLE_STATUSES = (429, 503)
+
+BUNDLE_PREFIX = '.pollination-bundle-'
+BUNDLE_SUFFIX = '.tar.gz'
+
+
+def artifact_key(file_path: str) -> str:
+    """Convert a local file path into a project artifact key."""
+    return os.path.normpath(file_path).replace('\\', '/')
+
+
+def file_digest(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calculate the sha256 digest of a file without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PathFilter(object):
+    """Include and exclude glob patterns for paths relative to a transfer root.
+
+    Patterns use ``fnmatch`` syntax where ``*`` also matches ``/``. Patterns without
+    a ``/`` are matched against the name of a file or folder at any depth while
+    patterns with a ``/`` are matched against the full relative path. Everything
+    below a folder that matches an include pattern is included. Folders are pruned
+    as soon as they match an exclude pattern or can not contain any path that
+    matches an include pattern, so they never have to be listed.
+
+    Args:
+        include: Glob patterns for the paths to include. Everything is included if
+            no pattern is provided.
+        exclude: Glob patterns for the paths to exclude.
+    """
+
+    def __init__(self, include: List[str] = None, exclude: List[str] = None):
+        self.include = [p.strip('/') for p in include or []]
+        self.exclude = [p.strip('/') for p in exclude or []]
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    @staticmethod
+    def _match(path: str, pattern: str) -> bool:
+        if '/' in pattern:
+            return fnmatchcase(path, pattern)
+        return fnmatchcase(path.rsplit('/', 1)[-1], pattern)
+
+    def _matches_any(self, path: str, patterns: List[str]) -> bool:
+        return any(self._match(path, pattern) for pattern in patterns)
+
+    def _included_by_folder(self, path: str) -> bool:
+        segments = path.split('/')
+        return any(
+            self._matches_any('/'.join(segments[:i]), self.include)
+            for i in range(1, len(segments) + 1)
+        )
+
+    @staticmethod
+    def _may_contain(path: str, pattern: str) -> bool:
+        if '/' not in pattern:
+            return True
+        pattern_segments = pattern.split('/')
+        for index, segment in enumerate(path.split('/')):
+            if index >= len(pattern_segments):
+                return False
+            if '*' in pattern_segments[index]:
+                # a wildcard can match any number of folders
+                return True
+            if not fnmatchcase(segment, pattern_segments[index]):
+                return False
+        return True
+
+    def include_folder(self, path: str) -> bool:
+        """Check if a folder should be traversed."""
+        if self._matches_any(path, self.exclude):
+            return False
+        if not self.include or self._included_by_folder(path):
+            return True
+        return any(self._may_contain(path, pattern) for pattern in self.include)
+
+    def include_file(self, path: str) -> bool:
+        """Check if a file should be transferred."""
+        if self._matches_any(path, self.exclude):
+            return False
+        return not self.include or self._included_by_folder(path)
+
+
+def scan_files(path: str, path_filter: PathFilter = None) -> Iterator[str]:
+    """Lazily walk a folder and yield the path of every file that passes a filter.
+
+    Folders are read one at a time with ``os.scandir`` and files are yielded as soon
+    as they are found, so memory use does not grow with the number of files.
+    Symbolic links to folders are not followed.
+
+    Args:
+        path: Path to a folder or a single file.
+        path_filter: An optional filter for the files and folders to include.
+            Paths are matched relative to ``path``.
+    """
+    path_filter = path_filter or PathFilter()
+    if os.path.isfile(path):
+        if path_filter.include_file(os.path.basename(path)):
+            yield path
+        return
+
+    folders = [(path, '')]
+    while folders:
+        folder, relative_folder = folders.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                relative_path = f'{relative_folder}{entry.name}'
+                if entry.is_dir():
+                    if not entry.is_symlink() \
+                            and path_filter.include_folder(relative_path):
+                        folders.append((entry.path, f'{relative_path}/'))
+                elif path_filter.include_file(relative_path):
+                    yield entry.path
+
+
+def map_bounded(
+    executor: Executor, func: Callable, items: Iterable, limit: int
+) -> Iterator:
+    """Call a function on every item with an executor without submitting every item
+    at once.
+
+    Items are pulled from ``items`` only while fewer than ``limit`` calls are in
+    flight. Results are yielded in the order the calls complete.
+    """
+    in_flight = set()
+    for item in items:
+        if len(in_flight) >= limit:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        in_flight.add(executor.submit(func, item))
+
+    for future in as_completed(in_flight):
+        yield future.result()
+
+
+def is_bundle(file_name: str) -> bool:
+    """Check if a file name belongs to an archive written by ``TarBundler``."""
+    return file_name.startswith(BUNDLE_PREFIX) and file_name.endswith(BUNDLE_SUFFIX)
+
+
+class TarBundler(object):
+    """Pack files into a sequence of gzipped tar archives.
+
+    Archives are written to a temporary folder on disk, one at a time, and a new
+    archive is started as soon as the current one holds ``max_size`` bytes of
+    uncompressed data. Archive members are named relative to the bundled folder so
+    that extracting an archive into the folder it was uploaded to restores the
+    original layout.
+
+    Archive names start with an upload ID made of the UTC time and a random suffix
+    so a new upload never overwrites the archives of an earlier one. Sorting archive
+    names puts them in upload order, which lets later uploads be extracted over
+    earlier ones.
+
+    Args:
+        folder_key: The artifact key of the folder that is bundled.
+        max_size: Maximum number of uncompressed bytes in a single archive.
+
+    Usage:
+
+    .. code-block:: python
+
+        with TarBundler('model') as bundler:
+            for file_path, arcname in files:
+                bundle = bundler.add(file_path, arcname)
+                if bundle is not None:
+                    upload(*bundle)
+            bundle = bundler.finish()
+            if bundle is not None:
+                upload(*bundle)
+    """
+
+    def __init__(self, folder_key: str, max_size: int = 512 * 1024 * 1024):
+        self.folder_key = '' if folder_key == '.' else folder_key
+        self.max_size = max_size
+        self.directory = tempfile.mkdtemp(prefix='pollination-bundles-')
+        self.upload_id = \
+            f'{datetime.now(timezone.utc):%Y%m%dT%H%M%S%fZ}-{uuid.uuid4().hex[:8]}'
+        self._index = 0
+        self._tar = None
+        self._path = None
+        self._size = 0
+
+    def _bundle_key(self) -> str:
+        name = f'{BUNDLE_PREFIX}{self.upload_id}-{self._index:04d}{BUNDLE_SUFFIX}'
+        return f'{self.folder_key}/{name}' if self.folder_key else name
+
+    def add(self, file_path: str, arcname: str) -> Tuple[str, str]:
+        """Add a file to the current archive.
+
+        Returns:
+            Tuple[str, str] -- The path and artifact key of an archive once it is
+                full, otherwise None.
+        """
+        if self._tar is None:
+            self._path = os.path.join(self.directory, f'{self._index:04d}{BUNDLE_SUFFIX}')
+            self._tar = tarfile.open(self._path, 'w:gz')
+            self._size = 0
+
+        self._tar.add(file_path, arcname=arcname, recursive=False)
+        self._size += os.path.getsize(file_path)
+
+        if self._size >= self.max_size:
+            return self.finish()
+
+    def finish(self) -> Tuple[str, str]:
+        """Close the current archive.
+
+        Returns:
+            Tuple[str, str] -- The path and artifact key of the archive or None if
+                there is no open archive.
+        """
+        if self._tar is None:
+            return None
+        self._tar.close()
+        bundle = (self._path, self._bundle_key())
+        self._tar = None
+        self._index += 1
+        return bundle
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def bundle_order(file_path: str) -> Tuple[str, str]:
+    """Get a sort key that puts archives written by ``TarBundler`` in upload order."""
+    return os.path.basename(file_path), file_path
+
+
+def extract_bundle(file_path: str):
+    """Extract an archive written by ``TarBundler`` next to it and remove it."""
+    destination = os.path.realpath(os.path.dirname(file_path))
+    with tarfile.open(file_path, 'r:gz') as tar:
+        if hasattr(tarfile, 'data_filter'):
+            tar.extractall(destination, filter='data')
+        else:
+            for member in tar.getmembers():
+                target = os.path.realpath(os.path.join(destination, member.name))
+                if os.path.commonpath([destination, target]) != destination:
+                    raise ValueError(f'Invalid path in archive {file_path}: {member.name}')
+            tar.extractall(destination)
+    os.remove(file_path)
+
+
+def error_status(error: Exception) -> int:
+    """Get the HTTP status code from an API or requests error if there is one."""
+    status = getattr(error, 'status', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status
+
+
+def raise_for_retry(response: requests.Response):
+    """Raise an HTTPError if a storage response indicates that it should be retried."""
+    if response.status_code in RETRY_STATUSES:
+        raise requests.HTTPError(
+            f'{response.status_code} Error: {response.reason} for url: {response.url}',
+            response=response
+        )
+
+
+class ConcurrencyLimiter(object):
+    """Limit the number of calls that are in flight at the same time.
+
+    Calls that fail with a 429 or 5xx status are retried with an exponential
+    backoff. In adaptive mode the limit starts low and is increased by one for as
+    long as the observed throughput keeps up, decreased by one when throughput
+    drops and halved whenever a call is throttled.
+
+    Args:
+        limit: Maximum number of concurrent calls.
+        adaptive: Adjust the number of concurrent calls between 1 and ``limit``
+            based on throughput and throttling.
+        retries: Number of times a throttled call is retried.
+        backoff: Initial number of seconds to wait before retrying a call.
+    """
+
+    def __init__(
+        self, limit: int, adaptive: bool = False, retries: int = 5,
+        backoff: float = 1.0
+    ):
+        self.max_limit = max(limit, 1)
+        self.adaptive = adaptive
+        self.limit = min(2, self.max_limit) if adaptive else self.max_limit
+        self.retries = retries
+        self.backoff = backoff
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._throughput = None
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._window_size = 0
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def _record_success(self, size: int):
+        if not self.adaptive:
+            return
+        with self._cond:
+            self._window_count += 1
+            self._window_size += size
+            if self._window_count < self.limit:
+                return
+            elapsed = max(time.monotonic() - self._window_start, 1e-6)
+            # use bytes per second for transfers and calls per second otherwise
+            throughput = (self._window_size or self._window_count) / elapsed
+            if self._throughput is None or throughput >= self._throughput * 0.9:
+                self.limit = min(self.limit + 1, self.max_limit)
+            else:
+                self.limit = max(self.limit - 1, 1)
+            self._throughput = throughput
+            self._reset_window()
+            self._cond.notify_all()
+
+    def _record_throttle(self):
+        if not self.adaptive:
+            return
+        with self._cond:
+            self.limit = max(self.limit // 2, 1)
+            self._throughput = None
+            self._reset_window()
+
+    def call(
+        self, func: Callable[[], Any], size: int = 0,
+        retry_statuses: Tuple[int, ...] = RETRY_STATUSES
+    ) -> Any:
+        """Call a function once a slot is available.
+
+        Args:
+            func: The function to call. It is called without arguments.
+            size: Number of bytes moved by the call. Used to measure throughput.
+            retry_statuses: The status codes to retry the call on. Use
+                ``THROTTLE_STATUSES`` for calls that are not idempotent since a 5xx
+                error can be returned after the server already handled the call.
+        """
+        for attempt in range(self.retries + 1):
+            with self:
+                try:
+                    result = func()
+                except Exception as error:
+                    if error_status(error) not in retry_statuses \
+                            or attempt == self.retries:
+                        raise
+                    self._record_throttle()
+                else:
+                    self._record_success(size)
+                    return result
+            time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+class MultipartFileEncoder(object):
+    """Stream a ``multipart/form-data`` body for a presigned POST upload.
+
+    The body is assembled on the fly while it is read so only a single chunk of
+    the file is held in memory at any time, regardless of the size of the file.
+    The encoder has a known length which lets ``requests`` send it with a
+    ``Content-Length`` header instead of chunked transfer encoding.
+
+    Args:
+        fields: Form fields returned with the presigned URL. These are sent before
+            the file.
+        file_path: Path to the file to upload.
+        file_name: The file name to use in the form data.
+        chunk_size: Number of bytes to read from the file at a time.
+
+    Usage:
+
+    .. code-block:: python
+
+        with MultipartFileEncoder(fields, file_path, key) as encoder:
+            session.post(
+                url, data=encoder, headers={'Content-Type': encoder.content_type}
+            )
+    """
+
+    def __init__(
+        self, fields: dict, file_path: str, file_name: str = None,
+        chunk_size: int = 64 * 1024
+    ):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        file_name = (file_name or os.path.basename(file_path)).replace('"', '%22')
+
+        head = b''
+        for name, value in (fields or {}).items():
+            head += self._part_header(f'name="{name}"') \
+                + str(value).encode('utf-8') + b'\r\n'
+        head += self._part_header(
+            f'name="file"; filename="{file_name}"',
+            'Content-Type: application/octet-stream\r\n'
+        )
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+        self._file = open(file_path, 'rb')
+        self._length = len(head) + os.fstat(self._file.fileno()).st_size + len(tail)
+        self._segments = [head, self._file, tail]
+
+    def _part_header(self, disposition: str, extra: str = '') -> bytes:
+        return (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; {disposition}\r\n'
+            f'{extra}\r\n'
+        ).encode('utf-8')
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        # never read the whole body at once, even if asked to
+        if size is None or size < 0:
+            size = self.chunk_size
+        chunks = []
+        remaining = size
+        while self._segments and remaining > 0:
+            segment = self._segments[0]
+            if isinstance(segment, bytes):
+                data = segment[:remaining]
+                self._segments[0] = segment[remaining:]
+                exhausted = not self._segments[0]
+            else:
+                data = segment.read(remaining)
+                exhausted = not data
+            if exhausted:
+                self._segments.pop(0)
+            chunks.append(data)
+            remaining -= len(data)
+        return b''.join(chunks)
+
+    def __iter__(self):
+        return iter(lambda: self.read(self.chunk_size), b'')
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _expected_size(response: requests.Response, offset: int) -> int:
+    """Get the full size of a file from a download response if it is known."""
+    content_range = response.headers.get('Content-Range')
+    if content_range is not None and '/' in content_range:
+        total = content_range.rsplit('/', 1)[-1]
+        return int(total) if total.isdigit() else None
+    content_length = response.headers.get('Content-Length')
+    if content_length is not None and content_length.isdigit():
+        return offset + int(content_length)
+    return None
+
+
+def download_file(
+    session: requests.Session, url: str, file_path: str,
+    chunk_size: int = 1024 * 1024, retries: int = 5
+):
+    """Stream a file from a presigned URL to disk.
+
+    The file is written in chunks to a ``.part`` file next to ``file_path`` which is
+    renamed into place once the download is complete, so an interrupted download
+    never leaves a partial file at ``file_path``. If the connection drops, the
+    download resumes from the end of the ``.part`` file with an HTTP Range request.
+    A ``.part`` file left behind by an earlier run is resumed the same way as long
+    as the remote file has not changed since.
+
+    Args:
+        session: The session to download the file with.
+        url: The presigned download URL.
+        file_path: The path to write the file to.
+        chunk_size: Number of bytes to hold in memory at a time.
+        retries: Number of times an interrupted download is resumed.
+    """
+    temp_path = f'{file_path}.part'
+    validator_path = f'{temp_path}.validator'
+
+    validator = None
+    if os.path.isfile(validator_path):
+        with open(validator_path) as f:
+            validator = f.read().strip() or None
+
+    for attempt in range(retries + 1):
+        offset = os.path.getsize(temp_path) if os.path.isfile(temp_path) else 0
+        headers = {}
+        if offset and validator is not None:
+            # only accept a partial response if the file has not changed
+            headers = {'Range': f'bytes={offset}-', 'If-Range': validator}
+
+        try:
+            with session.get(url=url, headers=headers, stream=True) as response:
+                if response.status_code == 416:
+                    # the partial file does not match the remote file. Start over.
+                    os.remove(temp_path)
+                    continue
+                raise_for_retry(response)
+                response.raise_for_status()
+
+                if response.status_code != 206:
+                    offset = 0
+                    validator = response.headers.get('ETag') \
+                        or response.headers.get('Last-Modified')
+                    with open(validator_path, 'w') as f:
+                        f.write(validator or '')
+
+                expected_size = _expected_size(response, offset)
+                with open(temp_path, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                raise
+            continue
+
+        if expected_size is None or os.path.getsize(temp_path) >= expected_size:
+            break
+    else:
+        raise requests.ConnectionError(f'Incomplete download for {file_path}')
+
+    os.replace(temp_path, file_path)
+    os.remove(validator_path)
+
+
+def is_downloaded(file, file_path: str) -> bool:
+    """Check if a local file matches the size and last modified time of a remote file.
+
+    Files downloaded by ``FolderDownloader`` get the last modified time of the
+    remote file so this check holds until either copy changes.
+    """
+    if file.size is None or file.last_modified is None:
+        return False
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return False
+    return stat.st_size == file.size \
+        and abs(stat.st_mtime - file.last_modified.timestamp()) < 1
+
+
+class FolderDownloader(object):
+    """Download a remote folder tree breadth first.
+
+    Folder listings are fetched concurrently and every file that is found is handed
+    to a bounded pool of transfer workers, so downloads start while the rest of the
+    tree is still being listed. At most twice as many downloads as transfer workers
+    are queued at a time so memory use does not grow with the size of the tree.
+    Local folders are created once, when the remote folder is found.
+
+    Args:
+        list_folder: A function that takes a remote path (a list with a single key or
+            None for the root folder) and returns a list of ``FileMeta`` objects.
+        get_download_link: A function that takes a file key and returns a presigned
+            download URL.
+        session: The session used to download files from presigned URLs.
+        api_limiter: Limiter for folder listings and download link requests.
+        transfer_limiter: Limiter for file downloads.
+        skip_existing: Skip files that already exist locally with the same size and
+            last modified time as the remote file.
+        path_filter: An optional filter for the files and folders to download. Paths
+            are matched relative to the downloaded folder.
+    """
+
+    def __init__(
+        self, list_folder: Callable, get_download_link: Callable,
+        session: requests.Session, api_limiter: ConcurrencyLimiter,
+        transfer_limiter: ConcurrencyLimiter, skip_existing: bool = True,
+        path_filter: PathFilter = None
+    ):
+        self.list_folder = list_folder
+        self.get_download_link = get_download_link
+        self.session = session
+        self.api_limiter = api_limiter
+        self.transfer_limiter = transfer_limiter
+        self.skip_existing = skip_existing
+        self.path_filter = path_filter or PathFilter()
+
+    def _list(self, path: List[str]) -> list:
+        return self.api_limiter.call(lambda: self.list_folder(path))
+
+    def _download(self, file, file_path: str, on_download: Callable = None):
+        url = self.api_limiter.call(lambda: self.get_download_link(file.key))
+        self.transfer_limiter.call(
+            lambda: download_file(self.session, url, file_path), size=file.size or 0
+        )
+        if file.last_modified is not None:
+            timestamp = file.last_modified.timestamp()
+            os.utime(file_path, (timestamp, timestamp))
+        if on_download is not None:
+            on_download(file, file_path)
+
+    def download_file(self, file, file_path: str, on_download: Callable = None) -> bool:
+        """Download a single remote file.
+
+        Args:
+            file: The ``FileMeta`` of the remote file.
+            file_path: The local path to download the file to.
+            on_download: An optional function that is called with the ``FileMeta``
+                and local path of the file once it is downloaded.
+
+        Returns:
+            bool -- False if the file was skipped because it already exists.
+        """
+        if self.skip_existing and is_downloaded(file, file_path):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        self._download(file, file_path, on_download)
+        return True
+
+    def download(
+        self, local_path: str, path: List[str] = None, on_download: Callable = None
+    ) -> Tuple[int, int]:
+        """Download all the files under a remote folder.
+
+        Args:
+            local_path: The local folder to download the files to.
+            path: The remote folder to download as a list with a single key. Set to
+                None to download the root folder.
+            on_download: An optional function that is called with the ``FileMeta``
+                and local path of every downloaded file.
+
+        Returns:
+            int -- The number of downloaded files.
+            int -- The number of files that were skipped because they already exist.
+        """
+        os.makedirs(local_path, exist_ok=True)
+        # listing waits once this many downloads are queued or in flight
+        max_pending = self.transfer_limiter.max_limit * 2
+
+        errors = []
+        downloads = set()
+        lock = threading.Lock()
+        count = 0
+        skipped = 0
+
+        def _done(future: Future):
+            with lock:
+                downloads.discard(future)
+            if future.exception() is not None:
+                errors.append(future.exception())
+
+        root = f'{path[0].strip("/")}/' if path else ''
+
+        def _relative(key: str) -> str:
+            key = key.strip('/')
+            return key[len(root):] if key.startswith(root) else key
+
+        with ThreadPoolExecutor(max_workers=self.api_limiter.max_limit) as listing, \
+                ThreadPoolExecutor(max_workers=self.transfer_limiter.max_limit) as transfers:
+            folders = {listing.submit(self._list, path): local_path}
+            while folders and not errors:
+                done, _ = wait(folders, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder_path = folders.pop(future)
+                    for file in future.result():
+                        target = os.path.join(folder_path, file.file_name)
+                        if file.file_type == 'folder':
+                            if not self.path_filter.include_folder(_relative(file.key)):
+                                continue
+                            os.makedirs(target, exist_ok=True)
+                            folders[listing.submit(self._list, [file.key])] = target
+                        elif not self.path_filter.include_file(_relative(file.key)):
+                            continue
+                        elif self.skip_existing and is_downloaded(file, target):
+                            skipped += 1
+                        else:
+                            with lock:
+                                pending = list(downloads)
+                            if len(pending) >= max_pending:
+                                wait(pending, return_when=FIRST_COMPLETED)
+                            count += 1
+                            download = transfers.submit(
+                                self._download, file, target, on_download
+                            )
+                            with lock:
+                                downloads.add(download)
+                            download.add_done_callback(_done)
+
+            for future in folders:
+                future.cancel()
+            with lock:
+                pending = list(downloads)
+            wait(pending)
+
+        if errors:
+            raise errors[0]
+
+        return count, skipped
+
+
+class FolderManifest(object):
+    """A local record of the files that were uploaded from a folder to a project.
+
+    Each entry is keyed by artifact key and stores the size, modification time and
+    content digest of the local file as well as the digest that was last uploaded.
+    Digests are only recalculated when the size or modification time of a file
+    changes.
+
+    Args:
+        manifest_path: Path to the JSON file used to persist the manifest.
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self.entries = {}
+
+        if os.path.isfile(manifest_path):
+            try:
+                with open(manifest_path) as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                # a corrupted manifest only means everything is re-hashed
+                self.entries = {}
+
+    @classmethod
+    def for_folder(
+        cls, cache_directory: str, endpoint: str, owner: str, project: str,
+        folder: str
+    ) -> 'FolderManifest':
+        """Get the manifest for a local folder synced to a specific project."""
+        source = '|'.join([endpoint, owner, project, os.path.abspath(folder)])
+        name = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        return cls(os.path.join(cache_directory, 'manifests', f'{name}.json'))
+
+    def digest(self, file_path: str, key: str) -> str:
+        """Get the content digest of a local file, re-using the cached value if the
+        file has not been modified since it was last hashed."""
+        stat = os.stat(file_path)
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry['size'] == stat.st_size \
+                and entry['mtime'] == stat.st_mtime_ns:
+            return entry['digest']
+
+        digest = file_digest(file_path)
+        with self._lock:
+            uploaded = (entry or {}).get('uploaded')
+            self.entries[key] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'digest': digest,
+                'uploaded': uploaded,
+            }
+        return digest
+
+    def is_synced(self, file_path: str, key: str, remote_size: int = None) -> bool:
+        """Check if the current content of a local file was already uploaded.
+
+        Args:
+            file_path: Path to the local file.
+            key: The artifact key for this file.
+            remote_size: The size of the remote artifact or None if the artifact
+                does not exist in the project.
+        """
+        digest = self.digest(file_path, key)
+        if remote_size is None:
+            return False
+        with self._lock:
+            entry = self.entries[key]
+        return entry['uploaded'] == digest and entry['size'] == remote_size
+
+    def mark_uploaded(self, key: str):
+        """Record that the current content of a file was uploaded."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry['uploaded'] = entry['digest']
+
+    def save(self):
+        """Write the manifest to disk."""
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        with self._lock:
+            data = json.dumps(self.entries)
+        temp_path = f'{self.manifest_path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(data)
+        os.replace(temp_path, self.manifest_path)
@@ -0,0 +1,63 @@
+import base64
+import json
+import time
+
+from queenbee_pollination.cli.context import Context
+from queenbee_pollination.config import Config
+
+
+def make_jwt(expiry: float) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': expiry}).encode('utf-8'))
+    return f'header.{payload.decode("utf-8").rstrip("=")}.signature'
+
+
+class QueenbeeConfig(object):
+
+    def __init__(self, token: str):
+        self.token = token
+
+    def get_auth_header(self, repository_url: str) -> str:
+        return f'Bearer {self.token}'
+
+
+class QueenbeeContext(object):
+    """A stand-in for the queenbee CLI context that counts token refreshes."""
+
+    def __init__(self, token: str, new_token: str = None):
+        self.config = QueenbeeConfig(token)
+        self.new_token = new_token or token
+        self.refreshed = 0
+
+    def refresh_tokens(self):
+        self.refreshed += 1
+        self.config.token = self.new_token
+
+
+def get_client(ctx: Context, monkeypatch):
+    monkeypatch.setattr(Config, 'get_client', lambda self: object())
+    return ctx.get_client()
+
+
+def test_valid_token_is_not_refreshed(monkeypatch):
+    ctx = Context()
+    ctx.queenbee = QueenbeeContext(make_jwt(time.time() + 3600))
+    client = get_client(ctx, monkeypatch)
+    assert get_client(ctx, monkeypatch) is client
+    assert ctx.queenbee.refreshed == 0
+
+
+def test_expiring_token_is_refreshed(monkeypatch):
+    new_token = make_jwt(time.time() + 3600)
+    ctx = Context()
+    ctx.queenbee = QueenbeeContext(make_jwt(time.time() + 10), new_token)
+    get_client(ctx, monkeypatch)
+    assert ctx.queenbee.refreshed == 1
+    assert ctx.config.jwt_token == new_token
+
+
+def test_undecodable_token_is_refreshed(monkeypatch):
+    ctx = Context()
+    ctx.queenbee = QueenbeeContext('not-a-jwt')
+    get_client(ctx, monkeypatch)
+    get_client(ctx, monkeypatch)
+    assert ctx.queenbee.refreshed == 2
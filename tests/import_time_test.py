@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that should only be imported once a command needs them
+HEAVY_MODULES = (
+    'pollination_sdk', 'queenbee.job', 'queenbee.recipe', 'requests', 'tabulate'
+)
+
+# the CLI entry point may take at most this many times as long to import as click.
+# Importing any of the heavy modules takes many times longer than click on any
+# machine, so comparing against click in the same run does not depend on the speed
+# of the machine.
+IMPORT_TIME_FACTOR = float(os.environ.get('POLLINATION_IMPORT_TIME_FACTOR', '2'))
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def test_cli_help_is_lazy():
+    code = (
+        'import sys\n'
+        'from click.testing import CliRunner\n'
+        'from queenbee_pollination.cli import pollination\n'
+        'result = CliRunner().invoke(pollination, ["--help"])\n'
+        'assert result.exit_code == 0, result.output\n'
+        f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n'
+    )
+    assert _run_python('-c', code).stdout.strip() == ''
+
+
+def _import_time(module: str, runs: int = 5) -> float:
+    """Get the shortest time it takes to import a module in a new interpreter."""
+    code = (
+        'import time\n'
+        'start = time.perf_counter()\n'
+        f'import {module}\n'
+        'print(time.perf_counter() - start)\n'
+    )
+    return min(float(_run_python('-c', code).stdout) for _ in range(runs))
+
+
+def test_cli_import_time():
+    baseline = _import_time('click')
+    import_time = _import_time('queenbee_pollination.cli')
+    assert import_time < baseline * IMPORT_TIME_FACTOR, \
+        f'importing the CLI took {import_time:.3f}s, click took {baseline:.3f}s'
@@ -0,0 +1,126 @@
+import json
+import os
+import tarfile
+from types import SimpleNamespace
+
+from click.testing import CliRunner
+
+from pollination_sdk.exceptions import ApiException
+from pollination_sdk.models import FileMeta
+
+from queenbee_pollination import transfer
+from queenbee_pollination.cli import project
+from queenbee_pollination.cli.project import download_outputs, list_remote_files, \
+    upload_folder
+
+
+def file_meta(key: str, file_type: str = 'file', size: int = 1) -> FileMeta:
+    return FileMeta(
+        key=key, file_name=key.rsplit('/', 1)[-1], file_type=file_type, size=size
+    )
+
+
+class ArtifactsApi(object):
+    """A stand-in for the SDK artifacts API that lists a fixed folder tree."""
+
+    def __init__(self, folders: dict):
+        self.folders = folders
+
+    def list_artifacts(self, owner, name, path=None):
+        key = None if path is None else path[0]
+        try:
+            return self.folders[key]
+        except KeyError:
+            raise ApiException(status=404, reason='Not Found')
+
+
+def test_list_remote_files():
+    client = SimpleNamespace(artifacts=ArtifactsApi({
+        None: [file_meta('model.hbjson', size=10), file_meta('grids', 'folder')],
+        'grids': [file_meta('grids/room.pts', size=20)],
+    }))
+    files = list_remote_files(client, 'ladybug', 'demo')
+    assert {key: file.size for key, file in files.items()} == \
+        {'model.hbjson': 10, 'grids/room.pts': 20}
+    assert list_remote_files(client, 'ladybug', 'demo', ['missing']) == {}
+
+
+class RawResponse(object):
+    """A stand-in for the urllib3 response returned with ``_preload_content=False``."""
+
+    def __init__(self, data: dict):
+        self.data = json.dumps(data).encode('utf-8')
+
+    def release_conn(self):
+        pass
+
+
+class RunsApi(object):
+    """A stand-in for the SDK runs API with a single run."""
+
+    def __init__(self, outputs: list, folders: dict):
+        self.outputs = outputs
+        self.folders = folders
+
+    def get_run(self, owner, name, run_id, _preload_content=True):
+        return RawResponse({'status': {'id': run_id, 'outputs': self.outputs}})
+
+    def list_run_artifacts(self, owner, name, run_id, path=None):
+        return self.folders[None if path is None else path[0]]
+
+    def download_run_artifact(self, owner, name, run_id, path):
+        return f'https://storage/{path}'
+
+
+def test_download_run_outputs(tmp_path, monkeypatch):
+    def _download_file(session, url, file_path):
+        with open(file_path, 'w') as f:
+            f.write(url)
+
+    monkeypatch.setattr(transfer, 'download_file', _download_file)
+    runs = RunsApi(
+        outputs=[
+            {'name': 'results', 'type': 'StepFolderOutput', 'path': 'results'},
+            {'name': 'summary', 'type': 'StepFileOutput', 'path': 'summary.json'},
+        ],
+        folders={
+            None: [file_meta('results', 'folder'), file_meta('summary.json')],
+            'results': [file_meta('results/room.ill')],
+        },
+    )
+    client = SimpleNamespace(runs=runs, session=None)
+    result = CliRunner().invoke(
+        download_outputs,
+        ['run-1', '-p', 'demo', '-o', 'ladybug', '-l', str(tmp_path)],
+        obj=SimpleNamespace(get_client=lambda: client),
+    )
+    assert result.exit_code == 0, result.output
+    assert 'Downloaded 2 files' in result.output
+    with open(os.path.join(tmp_path, 'run-1', 'results', 'room.ill')) as f:
+        assert f.read() == 'https://storage/results/room.ill'
+    assert os.path.isfile(os.path.join(tmp_path, 'run-1', 'summary.json'))
+
+
+def test_upload_single_file_archive(tmp_path, monkeypatch):
+    uploads = {}
+
+    def _upload_file(client, owner, name, file_path, key, *limiters):
+        with tarfile.open(file_path) as tar:
+            uploads[key] = tar.getnames()
+        return SimpleNamespace(raise_for_status=lambda: None)
+
+    monkeypatch.setattr(project, 'upload_file', _upload_file)
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('grids')
+    with open(os.path.join('grids', 'room.pts'), 'w') as f:
+        f.write('0 0 0 0 0 1')
+
+    client = SimpleNamespace(projects=SimpleNamespace(get_project=lambda **kw: None))
+    result = CliRunner().invoke(
+        upload_folder, ['grids/room.pts', '-p', 'demo', '-o', 'ladybug', '--archive'],
+        obj=SimpleNamespace(get_client=lambda: client),
+    )
+    assert result.exit_code == 0, result.output
+    [(key, names)] = uploads.items()
+    assert key.startswith('grids/.pollination-bundle-')
+    assert names == ['room.pts']
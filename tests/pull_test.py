@@ -0,0 +1,146 @@
+import json
+import os
+from collections import Counter
+from types import SimpleNamespace
+
+import click
+import pytest
+
+from pollination_sdk import Configuration
+from pollination_sdk.exceptions import ApiException
+from pollination_sdk.models import Repository
+
+from queenbee.recipe import Recipe
+
+from queenbee_pollination.cli.pull import get_dependencies, get_package, write_package
+from queenbee_pollination.packages import PackageCache
+
+SOURCE = 'https://api.pollination.solutions/registries/ladybug'
+
+PLUGIN = {
+    'metadata': {'name': 'radiance', 'tag': '1.0.0'},
+    'config': {'docker': {'image': 'ladybug/radiance:1.0.0', 'workdir': '/home/run'}},
+    'functions': [{'name': 'echo', 'command': 'echo hi', 'inputs': [], 'outputs': []}],
+}
+
+RECIPE = {
+    'metadata': {'name': 'grid', 'tag': '0.1.0'},
+    'dependencies': [
+        {'kind': 'plugin', 'name': 'radiance', 'tag': '1.0.0', 'source': SOURCE}
+    ],
+    'flow': [{'name': 'main', 'tasks': [{'name': 'echo', 'template': 'radiance/echo'}]}],
+}
+
+
+class RawResponse(object):
+    """A stand-in for the urllib3 response returned with ``_preload_content=False``."""
+
+    def __init__(self, data: dict):
+        self.data = json.dumps(data).encode('utf-8')
+
+    def release_conn(self):
+        pass
+
+
+class RegistryApi(object):
+    """A stand-in for the SDK recipes or plugins API with the same method names."""
+
+    def __init__(self, kind: str, packages: dict):
+        self.kind = kind
+        self.packages = packages
+        self.calls = Counter()
+        setattr(self, f'get_{kind}', self._get)
+        setattr(self, f'get_{kind}_by_tag', self._get_by_tag)
+
+    def _get(self, owner, name):
+        self.calls[(name, None)] += 1
+        tags = [tag for (o, n, tag) in self.packages if (o, n) == (owner, name)]
+        if not tags:
+            raise ApiException(status=404, reason='Not Found')
+        config = Configuration()
+        config.client_side_validation = False
+        return Repository(
+            name=name, latest_tag=max(tags), local_vars_configuration=config
+        )
+
+    def _get_by_tag(self, owner, name, tag, _preload_content=True):
+        assert not _preload_content, 'the SDK can not deserialize package manifests'
+        self.calls[(name, tag)] += 1
+        try:
+            manifest = self.packages[(owner, name, tag)]
+        except KeyError:
+            raise ApiException(status=404, reason='Not Found')
+        return RawResponse(
+            {'manifest': manifest, 'readme': f'# {name}', 'digest': 'abc', 'tag': tag}
+        )
+
+
+class FakeClient(object):
+
+    def __init__(self, recipes: dict = None, plugins: dict = None):
+        self.config = SimpleNamespace(host='https://api.pollination.solutions')
+        self.recipes = RegistryApi('recipe', recipes or {})
+        self.plugins = RegistryApi('plugin', plugins or {})
+
+
+def test_get_package(tmp_path):
+    client = FakeClient(recipes={('ladybug', 'grid', '0.1.0'): RECIPE})
+    cache = PackageCache(str(tmp_path / 'cache'))
+
+    tag, package = get_package(client, cache, 'recipe', 'ladybug', 'grid')
+    assert tag == '0.1.0'
+    assert package == {'manifest': RECIPE, 'readme': '# grid'}
+
+    # the latest tag and the package are read from the cache
+    assert get_package(client, cache, 'recipe', 'ladybug', 'grid') == (tag, package)
+    assert client.recipes.calls == {('grid', None): 1, ('grid', '0.1.0'): 1}
+
+    write_package(
+        Recipe.parse_obj(package['manifest']), package['readme'],
+        str(tmp_path / 'grid')
+    )
+    assert os.path.isfile(tmp_path / 'grid' / 'package.yaml')
+
+
+def test_get_package_not_found(tmp_path):
+    cache = PackageCache(str(tmp_path / 'cache'))
+    with pytest.raises(click.ClickException, match='not found: ladybug/grid:0.2.0'):
+        get_package(FakeClient(), cache, 'recipe', 'ladybug', 'grid', '0.2.0')
+
+
+DAYLIGHT = {
+    'metadata': {'name': 'daylight', 'tag': '0.2.0'},
+    'dependencies': [
+        {'kind': 'recipe', 'name': 'grid', 'tag': '0.1.0', 'source': SOURCE},
+        {'kind': 'plugin', 'name': 'radiance', 'tag': '1.0.0', 'source': SOURCE},
+    ],
+    'flow': [{'name': 'main', 'tasks': [{'name': 'grid', 'template': 'grid'}]}],
+}
+
+
+def test_get_dependencies(tmp_path):
+    client = FakeClient(
+        recipes={('ladybug', 'grid', '0.1.0'): RECIPE},
+        plugins={('ladybug', 'radiance', '1.0.0'): PLUGIN},
+    )
+    cache = PackageCache(str(tmp_path / 'cache'))
+    recipe = Recipe.parse_obj(DAYLIGHT)
+
+    dependencies = get_dependencies(client, cache, recipe, concurrency=4)
+    assert sorted(dependencies) == [
+        ('plugin', 'ladybug', 'radiance', '1.0.0'),
+        ('recipe', 'ladybug', 'grid', '0.1.0'),
+    ]
+    # radiance is used by both recipes but only fetched once
+    assert client.plugins.calls == {('radiance', '1.0.0'): 1}
+    assert client.recipes.calls == {('grid', '0.1.0'): 1}
+
+    path = tmp_path / 'daylight'
+    write_package(recipe, '', str(path), dependencies=dependencies)
+    for folder in [
+        path / '.dependencies' / 'recipe' / 'grid',
+        path / '.dependencies' / 'plugin' / 'radiance',
+        path / '.dependencies' / 'recipe' / 'grid' / '.dependencies' / 'plugin'
+        / 'radiance',
+    ]:
+        assert os.path.isfile(folder / 'package.yaml'), folder
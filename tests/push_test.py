@@ -0,0 +1,166 @@
+import json
+import os
+
+import click
+import pytest
+
+from pollination_sdk.exceptions import ApiException
+
+from queenbee_pollination.cache import DiskCache
+from queenbee_pollination.cli import push
+from queenbee_pollination.cli.push import load_package, push_order, push_package
+from queenbee_pollination.packages import package_digest
+
+
+MANIFEST = {'metadata': {'name': 'daylight-factor', 'tag': '0.1.0'}, 'flow': []}
+
+
+class RawResponse(object):
+    """A stand-in for the urllib3 response returned with ``_preload_content=False``."""
+
+    def __init__(self, data: dict):
+        self.data = json.dumps(data).encode('utf-8')
+
+    def release_conn(self):
+        pass
+
+
+class RecipesApi(object):
+    """A stand-in for the SDK recipes API with the same method names."""
+
+    def __init__(self, packages: dict = None):
+        self.packages = packages or {}
+        self.created = []
+
+    def get_recipe(self, owner, name):
+        return {'owner': owner, 'name': name}
+
+    def get_recipe_by_tag(self, owner, name, tag, _preload_content=True):
+        assert not _preload_content, 'the SDK can not deserialize package manifests'
+        try:
+            return RawResponse(self.packages[(owner, name, tag)])
+        except KeyError:
+            raise ApiException(status=404, reason='Not Found')
+
+    def create_recipe_package(self, owner, name, new_recipe_package):
+        self.created.append((owner, name, new_recipe_package))
+
+
+class FakeClient(object):
+
+    def __init__(self, recipes: RecipesApi):
+        self.recipes = recipes
+
+
+def remote_package(digest: str, readme: str = '') -> dict:
+    return {'digest': digest, 'tag': '0.1.0', 'readme': readme, 'manifest': MANIFEST}
+
+
+def test_push_new_package():
+    api = RecipesApi()
+    assert push_package(FakeClient(api), 'recipe', 'ladybug', MANIFEST, 'readme')
+    assert api.created == [
+        ('ladybug', 'daylight-factor', {'manifest': MANIFEST, 'readme': 'readme'})
+    ]
+
+
+def test_push_unchanged_package():
+    api = RecipesApi({
+        ('ladybug', 'daylight-factor', '0.1.0'):
+            remote_package(package_digest(MANIFEST), 'readme')
+    })
+    assert not push_package(FakeClient(api), 'recipe', 'ladybug', MANIFEST, 'readme')
+    assert api.created == []
+
+
+def test_push_new_readme():
+    api = RecipesApi({
+        ('ladybug', 'daylight-factor', '0.1.0'): remote_package(package_digest(MANIFEST))
+    })
+    assert push_package(FakeClient(api), 'recipe', 'ladybug', MANIFEST, 'readme')
+    assert len(api.created) == 1
+
+
+def test_push_tag_conflict():
+    api = RecipesApi({
+        ('ladybug', 'daylight-factor', '0.1.0'): remote_package('0' * 64)
+    })
+    with pytest.raises(click.ClickException, match='already exists'):
+        push_package(FakeClient(api), 'recipe', 'ladybug', MANIFEST, 'readme')
+    assert api.created == []
+
+
+class CountingRecipe(object):
+    """A stand-in for the queenbee Recipe class that counts parsed folders."""
+
+    parsed = 0
+
+    def __init__(self, folder: str):
+        with open(os.path.join(folder, 'package.yaml')) as f:
+            self.tag = f.read()
+
+    @classmethod
+    def from_folder(cls, folder: str):
+        cls.parsed += 1
+        return cls(folder)
+
+    def to_dict(self) -> dict:
+        return {'metadata': {'name': 'daylight-factor', 'tag': self.tag}}
+
+
+def test_load_package_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(push, 'Recipe', CountingRecipe)
+    monkeypatch.setattr(push, 'queenbee_version', lambda: '1.0.0')
+    monkeypatch.setattr(CountingRecipe, 'parsed', 0)
+    folder = tmp_path / 'recipe'
+    folder.mkdir()
+    (folder / 'package.yaml').write_text('0.1.0')
+    cache = DiskCache(str(tmp_path / 'cache'))
+
+    assert load_package('recipe', str(folder), cache=cache)['metadata']['tag'] == '0.1.0'
+    assert load_package('recipe', str(folder), cache=cache)['metadata']['tag'] == '0.1.0'
+    assert CountingRecipe.parsed == 1
+
+    # edits replace the cached manifest of the folder
+    (folder / 'package.yaml').write_text('0.2.0')
+    assert load_package('recipe', str(folder), cache=cache)['metadata']['tag'] == '0.2.0'
+    assert CountingRecipe.parsed == 2
+    assert len(os.listdir(cache.directory)) == 1
+
+    # a new queenbee version parses the folder again
+    monkeypatch.setattr(push, 'queenbee_version', lambda: '2.0.0')
+    load_package('recipe', str(folder), cache=cache)
+    assert CountingRecipe.parsed == 3
+
+
+def package(name: str, *dependencies: tuple) -> dict:
+    return {
+        'metadata': {'name': name, 'tag': '0.1.0'},
+        'dependencies': [{'kind': kind, 'name': dep} for kind, dep in dependencies],
+    }
+
+
+def test_push_order():
+    packages = {
+        'plugins/radiance': ('plugin', package('radiance')),
+        'recipes/grid': ('recipe', package('grid', ('plugin', 'radiance'))),
+        'recipes/daylight': (
+            'recipe',
+            package('daylight', ('recipe', 'grid'), ('plugin', 'honeybee-radiance'))
+        ),
+    }
+    assert push_order(packages) == {
+        'plugins/radiance': [],
+        'recipes/grid': ['plugins/radiance'],
+        'recipes/daylight': ['recipes/grid'],
+    }
+
+
+def test_push_order_cycle():
+    packages = {
+        'recipes/a': ('recipe', package('a', ('recipe', 'b'))),
+        'recipes/b': ('recipe', package('b', ('recipe', 'c'))),
+        'recipes/c': ('recipe', package('c', ('recipe', 'a'))),
+    }
+    with pytest.raises(click.ClickException, match='Circular dependency'):
+        push_order(packages)
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from queenbee_pollination.runs import RunIndex, artifact_paths, watch_runs
+
+
+def make_run(run_id: str, status: str, started_at: datetime = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        status=SimpleNamespace(
+            id=run_id, status=status, started_at=started_at, finished_at=None
+        )
+    )
+
+
+class RunsApi(object):
+    """A stand-in for the SDK runs API that plays back a status history per run."""
+
+    def __init__(self, history: dict, max_calls: int = 20):
+        self.history = history
+        self.max_calls = max_calls
+        self.calls = 0
+
+    def list_runs(self, owner, name, ids=None, page=1, per_page=25, status=None):
+        self.calls += 1
+        assert self.calls <= self.max_calls, 'runs are still polled'
+        resources = []
+        for run_id in ids:
+            statuses = self.history[run_id]
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            resources.append(make_run(run_id, status))
+        return SimpleNamespace(resources=resources, page_count=1)
+
+
+def test_watch_runs_stops_on_error():
+    api = RunsApi({'a': ['Running', 'Running', 'Error'], 'b': ['Succeeded']})
+    changes = []
+    runs = watch_runs(
+        SimpleNamespace(runs=api), 'ladybug', 'demo', ['a', 'b'], interval=0,
+        on_change=lambda run, previous: changes.append(
+            (run.status.id, previous, run.status.status)
+        )
+    )
+    assert {run_id: run.status.status for run_id, run in runs.items()} == \
+        {'a': 'Error', 'b': 'Succeeded'}
+    assert ('a', 'Running', 'Error') in changes
+    assert api.calls == 3
+
+
+def test_watch_runs_stops_on_unknown_status():
+    api = RunsApi({'a': ['Running', 'Archived']})
+    runs = watch_runs(SimpleNamespace(runs=api), 'ladybug', 'demo', ['a'], interval=0)
+    assert runs['a'].status.status == 'Archived'
+
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def project_run(index: int, status: str = 'Succeeded') -> SimpleNamespace:
+    return make_run(f'run-{index}', status, START + timedelta(minutes=index))
+
+
+class ProjectRunsApi(object):
+    """A stand-in for the SDK runs API that lists runs in start order."""
+
+    def __init__(self, runs: list, newest_first: bool = False):
+        self.runs = runs
+        self.newest_first = newest_first
+        self.pages = []
+
+    def list_runs(self, owner, name, ids=None, page=1, per_page=25, status=None):
+        runs = self.runs[::-1] if self.newest_first else self.runs
+        if ids is not None:
+            runs = [run for run in runs if run.status.id in ids]
+        else:
+            self.pages.append(page)
+        start = (page - 1) * per_page
+        return SimpleNamespace(
+            resources=runs[start:start + per_page],
+            page_count=max((len(runs) + per_page - 1) // per_page, 1),
+            total_count=len(runs),
+        )
+
+
+@pytest.mark.parametrize('newest_first,pages', [(True, [1]), (False, [1, 3])])
+def test_run_index_refresh(tmp_path, newest_first, pages):
+    api = ProjectRunsApi([project_run(i) for i in range(6)], newest_first)
+    client = SimpleNamespace(runs=api)
+    with RunIndex(str(tmp_path / 'runs.db')) as index:
+        assert index.refresh(client, 'ladybug', 'demo', per_page=2) == (6, 0)
+        assert api.pages == [1, 2, 3]
+
+        # a deleted run does not hide a new run
+        del api.runs[0]
+        api.runs.append(project_run(6, 'Running'))
+        api.pages.clear()
+        assert index.refresh(client, 'ladybug', 'demo', per_page=2) == (1, 0)
+        assert api.pages == pages
+        assert index.query('ladybug', 'demo', limit=1)[0]['id'] == 'run-6'
+
+        # active runs are updated even if they are not on the requested pages
+        api.runs[-1] = project_run(6, 'Error')
+        api.runs.append(project_run(7))
+        api.runs.append(project_run(8))
+        api.pages.clear()
+        assert index.refresh(client, 'ladybug', 'demo', per_page=2) == (2, 1)
+        assert len(index.query('ladybug', 'demo', status='Error')) == 1
+        assert len(index.query('ladybug', 'demo')) == 9
+
+
+OUTPUTS = [
+    {'name': 'results', 'type': 'StepFolderOutput', 'path': 'results'},
+    {'name': 'grid-results', 'type': 'StepFolderOutput', 'path': 'results/grids/'},
+    {'name': 'summary', 'type': 'StepFileOutput', 'path': 'results/summary.json'},
+    {'name': 'metrics', 'type': 'StepFileOutput', 'path': 'metrics.json'},
+    {'name': 'metrics-copy', 'type': 'StepFileOutput', 'path': './metrics.json'},
+    {'name': 'area', 'type': 'StepNumberOutput', 'value': 12.5},
+]
+
+
+def test_artifact_paths_skip_nested_outputs():
+    assert artifact_paths(OUTPUTS) == {'results': 'results', 'metrics': 'metrics.json'}
+
+
+def test_artifact_paths_by_name():
+    assert artifact_paths(OUTPUTS, ['grid-results', 'summary']) == {
+        'grid-results': 'results/grids', 'summary': 'results/summary.json'
+    }
+    with pytest.raises(ValueError, match='Unknown outputs: missing'):
+        artifact_paths(OUTPUTS, ['missing'])
+    with pytest.raises(ValueError, match='not files or folders: area'):
+        artifact_paths(OUTPUTS, ['area'])
@@ -0,0 +1,341 @@
+import email.parser
+import email.policy
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from pollination_sdk.exceptions import ApiException
+from pollination_sdk.models import FileMeta
+
+from queenbee_pollination.transfer import THROTTLE_STATUSES, ConcurrencyLimiter, \
+    FolderDownloader, MultipartFileEncoder, PathFilter, TarBundler, bundle_order, \
+    download_file, extract_bundle, is_bundle, scan_files
+
+
+def failing_call(*statuses: int):
+    """Get a function that fails with each status in turn and then succeeds."""
+    calls = []
+
+    def _call():
+        calls.append(1)
+        if len(calls) <= len(statuses):
+            raise ApiException(status=statuses[len(calls) - 1])
+        return len(calls)
+
+    return _call
+
+
+def test_limiter_retries_server_errors():
+    limiter = ConcurrencyLimiter(2, backoff=0)
+    assert limiter.call(failing_call(502, 429, 500)) == 4
+
+
+def test_limiter_only_retries_throttled_calls():
+    limiter = ConcurrencyLimiter(2, backoff=0)
+    assert limiter.call(failing_call(429, 503), retry_statuses=THROTTLE_STATUSES) == 3
+    with pytest.raises(ApiException):
+        limiter.call(failing_call(502), retry_statuses=THROTTLE_STATUSES)
+
+
+def bundle_file(tmp_path, text: str) -> str:
+    """Bundle a single file with the given contents and return the archive path."""
+    source = tmp_path / 'source.txt'
+    source.write_text(text)
+    with TarBundler('grids') as bundler:
+        bundler.add(str(source), 'grid.pts')
+        file_path, key = bundler.finish()
+        assert key.startswith('grids/') and is_bundle(os.path.basename(key))
+        target = tmp_path / 'grids' / os.path.basename(key)
+        target.parent.mkdir(exist_ok=True)
+        shutil.copy(file_path, target)
+    return str(target)
+
+
+def test_bundles_are_unique_per_upload(tmp_path):
+    first = bundle_file(tmp_path, 'first')
+    second = bundle_file(tmp_path, 'second')
+    assert first != second
+
+    # later uploads are extracted last so their files win
+    for file_path in sorted([second, first], key=bundle_order):
+        extract_bundle(file_path)
+    assert (tmp_path / 'grids' / 'grid.pts').read_text() == 'second'
+    assert os.listdir(tmp_path / 'grids') == ['grid.pts']
+
+
+class CountingFilter(PathFilter):
+    """A filter that counts the files it is asked about."""
+
+    def __init__(self):
+        super().__init__()
+        self.files = 0
+
+    def __bool__(self):
+        return True
+
+    def include_file(self, path: str) -> bool:
+        self.files += 1
+        return True
+
+
+class BlockingDownloader(FolderDownloader):
+    """A downloader whose downloads wait until they are released."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+
+    def _download(self, file, file_path, on_download=None):
+        self.release.wait(5)
+
+
+def test_folder_downloader_bounds_pending_downloads(tmp_path):
+    files = [
+        FileMeta(key=f'file-{i}', file_name=f'file-{i}', file_type='file', size=1)
+        for i in range(100)
+    ]
+    path_filter = CountingFilter()
+    downloader = BlockingDownloader(
+        list_folder=lambda path: files,
+        get_download_link=None,
+        session=None,
+        api_limiter=ConcurrencyLimiter(2),
+        transfer_limiter=ConcurrencyLimiter(2),
+        path_filter=path_filter,
+    )
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(downloader.download(str(tmp_path)))
+    )
+    thread.start()
+    try:
+        time.sleep(0.2)
+        # two downloads in flight and two queued before listing waits
+        assert path_filter.files <= 5
+    finally:
+        downloader.release.set()
+        thread.join(5)
+    assert result == [(100, 0)]
+
+
+class WritingDownloader(FolderDownloader):
+    """A downloader that writes the key of each file instead of downloading it."""
+
+    def _download(self, file, file_path, on_download=None):
+        with open(file_path, 'w') as f:
+            f.write(file.key)
+
+
+def test_folder_downloader_tree(tmp_path):
+    folders = {
+        None: [
+            FileMeta(key='model.hbjson', file_name='model.hbjson', file_type='file'),
+            FileMeta(key='grids', file_name='grids', file_type='folder'),
+        ],
+        'grids': [
+            FileMeta(key='grids/room.pts', file_name='room.pts', file_type='file'),
+        ],
+    }
+    downloader = WritingDownloader(
+        list_folder=lambda path: folders[None if path is None else path[0]],
+        get_download_link=None,
+        session=None,
+        api_limiter=ConcurrencyLimiter(2),
+        transfer_limiter=ConcurrencyLimiter(2),
+    )
+    assert downloader.download(str(tmp_path)) == (2, 0)
+    assert (tmp_path / 'grids' / 'room.pts').read_text() == 'grids/room.pts'
+    assert (tmp_path / 'model.hbjson').read_text() == 'model.hbjson'
+
+
+class FileServer(object):
+    """A local HTTP server for a single file that supports Range and If-Range.
+
+    Args:
+        content: The contents of the file.
+        etag: The ETag of the file.
+        drop_after: Close the connection after sending this many bytes of the first
+            response.
+    """
+
+    def __init__(self, content: bytes, etag: str = '"v1"', drop_after: int = None):
+        self.content = content
+        self.etag = etag
+        self.drop_after = drop_after
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                content = server.content
+                start = 0
+                range_header = self.headers.get('Range')
+                if range_header and self.headers.get('If-Range') in (None, server.etag):
+                    start = int(range_header.split('=')[1].rstrip('-'))
+                    if start >= len(content):
+                        self.send_response(416)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header(
+                        'Content-Range', f'bytes {start}-{len(content) - 1}/{len(content)}'
+                    )
+                else:
+                    self.send_response(200)
+                self.send_header('ETag', server.etag)
+                self.send_header('Content-Length', str(len(content) - start))
+                self.end_headers()
+                body = content[start:]
+                if server.drop_after is not None:
+                    body = body[:server.drop_after]
+                    server.drop_after = None
+                    self.wfile.write(body)
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/file'
+
+    def __enter__(self):
+        threading.Thread(
+            target=self.httpd.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+CONTENT = bytes(range(256)) * 400
+
+
+def test_download_file(tmp_path):
+    file_path = str(tmp_path / 'file.bin')
+    with FileServer(CONTENT) as server, requests.Session() as session:
+        download_file(session, server.url, file_path)
+    with open(file_path, 'rb') as f:
+        assert f.read() == CONTENT
+    assert os.listdir(tmp_path) == ['file.bin']
+
+
+def test_download_file_resumes_after_drop(tmp_path):
+    file_path = str(tmp_path / 'file.bin')
+    with FileServer(CONTENT, drop_after=1000) as server, \
+            requests.Session() as session:
+        download_file(session, server.url, file_path, chunk_size=100)
+    with open(file_path, 'rb') as f:
+        assert f.read() == CONTENT
+    assert len(server.requests) == 2
+    assert server.requests[1]['Range'] == 'bytes=1000-'
+    assert server.requests[1]['If-Range'] == '"v1"'
+    assert os.listdir(tmp_path) == ['file.bin']
+
+
+def test_download_file_resumes_earlier_part_file(tmp_path):
+    file_path = str(tmp_path / 'file.bin')
+    (tmp_path / 'file.bin.part').write_bytes(CONTENT[:5000])
+    (tmp_path / 'file.bin.part.validator').write_text('"v1"')
+    with FileServer(CONTENT) as server, requests.Session() as session:
+        download_file(session, server.url, file_path)
+    with open(file_path, 'rb') as f:
+        assert f.read() == CONTENT
+    assert server.requests[0]['Range'] == 'bytes=5000-'
+
+
+def test_download_file_restarts_changed_file(tmp_path):
+    file_path = str(tmp_path / 'file.bin')
+    (tmp_path / 'file.bin.part').write_bytes(b'x' * 5000)
+    (tmp_path / 'file.bin.part.validator').write_text('"v0"')
+    with FileServer(CONTENT) as server, requests.Session() as session:
+        download_file(session, server.url, file_path)
+    with open(file_path, 'rb') as f:
+        assert f.read() == CONTENT
+    assert len(server.requests) == 1
+    assert os.listdir(tmp_path) == ['file.bin']
+
+
+def test_download_file_restarts_on_416(tmp_path):
+    file_path = str(tmp_path / 'file.bin')
+    (tmp_path / 'file.bin.part').write_bytes(b'x' * (len(CONTENT) + 10))
+    (tmp_path / 'file.bin.part.validator').write_text('"v1"')
+    with FileServer(CONTENT) as server, requests.Session() as session:
+        download_file(session, server.url, file_path)
+    with open(file_path, 'rb') as f:
+        assert f.read() == CONTENT
+    assert [request.get('Range') for request in server.requests] == \
+        [f'bytes={len(CONTENT) + 10}-', None]
+
+
+def test_multipart_file_encoder(tmp_path):
+    file_path = tmp_path / 'model.hbjson'
+    file_path.write_bytes(CONTENT)
+    fields = {'key': 'projects/model.hbjson', 'policy': 'abc=='}
+    with MultipartFileEncoder(fields, str(file_path), chunk_size=1000) as encoder:
+        # the body is never read in one go
+        first = encoder.read()
+        assert len(first) == 1000
+        body = first + b''.join(encoder)
+        content_type = encoder.content_type
+        assert len(body) == len(encoder)
+
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + body
+    )
+    parts = list(message.iter_parts())
+    assert [part.get_param('name', header='content-disposition') for part in parts] \
+        == ['key', 'policy', 'file']
+    assert parts[0].get_content() == 'projects/model.hbjson'
+    assert parts[2].get_filename() == 'model.hbjson'
+    assert parts[2].get_content() == CONTENT
+
+
+@pytest.mark.parametrize('include,exclude,path,expected', [
+    ([], [], 'grids/room.pts', True),
+    (['*.pts'], [], 'grids/room.pts', True),
+    (['*.pts'], [], 'grids/room.json', False),
+    (['grids'], [], 'grids/nested/room.json', True),
+    (['grids/*.pts'], [], 'grids/nested/room.pts', True),
+    (['grids/*.pts'], [], 'model/room.pts', False),
+    ([], ['*.tmp'], 'grids/room.tmp', False),
+    ([], ['results'], 'results/room.ill', False),
+    (['*.pts'], ['grids/nested'], 'grids/nested/room.pts', False),
+])
+def test_path_filter_files(include, exclude, path, expected):
+    path_filter = PathFilter(include=include, exclude=exclude)
+    folders = path.split('/')[:-1]
+    included = all(
+        path_filter.include_folder('/'.join(folders[:i + 1]))
+        for i in range(len(folders))
+    ) and path_filter.include_file(path)
+    assert included is expected
+
+
+def test_path_filter_prunes_folders():
+    path_filter = PathFilter(include=['model/grids/*.pts'], exclude=['.*'])
+    assert path_filter.include_folder('model')
+    assert path_filter.include_folder('model/grids')
+    assert not path_filter.include_folder('results')
+    assert not path_filter.include_folder('model/.cache')
+
+
+def test_scan_files(tmp_path):
+    for path in ['grids/room.pts', 'grids/room.tmp', 'results/room.ill', 'model.json']:
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).write_text('')
+    files = scan_files(str(tmp_path), PathFilter(exclude=['*.tmp', 'results']))
+    assert sorted(os.path.relpath(path, tmp_path) for path in files) == \
+        [os.path.join('grids', 'room.pts'), 'model.json']